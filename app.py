@@ -1,5 +1,8 @@
+import argparse
+import atexit
 import asset
 import sys
+import io
 import os
 
 
@@ -10,14 +13,7 @@ i18n = asset.utils.get_i18n('notice')
 
 CANDLE_NAME = str(factory.properties['candlestick']['name'])
 
-CANDLE_FILENAMES = {
-    'csv': f'{CANDLE_NAME}.csv',
-    'candlestick': f'{CANDLE_NAME}.png',
-    'number': f'{CANDLE_NAME}-number.png',
-    'merged': f'{CANDLE_NAME}-merged.png',
-    'coord': f'{CANDLE_NAME}-coord.png',
-    'horizontal': f'{CANDLE_NAME}-horizontal.png',
-}
+CANDLE_FILENAMES = asset.batch.artifact_filenames(CANDLE_NAME)
 
 CANDLE_FILEPATHS = {
     name: asset.utils.get_executable_directory(filename)
@@ -38,23 +34,108 @@ else:
         return None
 
 
+parser = argparse.ArgumentParser()
+parser.add_argument('csv', nargs='?', default='', help='K线数据CSV文件')
+parser.add_argument('-j', '--jobs', type=int, default=None, help='并行渲染的线程数 (批量模式下为同时处理的文件数)')
+parser.add_argument('-b', '--batch', metavar='SOURCE', default=None, help='批量模式: 目录、通配符或清单文件 (每行一个CSV路径)')
+parser.add_argument('-o', '--output', metavar='DIR', default=None, help='批量模式的输出目录 (默认为程序所在目录)')
+parser.add_argument('--pipe', nargs='?', const='merged', default=None, choices=asset.batch.ARTIFACTS, help='管道模式: 从标准输入读取CSV，向标准输出写入图像 (默认为merged图像)')
+parser.add_argument('-f', '--format', default='default', help=f'编码预设 ({", ".join(asset.encoding.PRESETS)})，可按图像分别指定，如 palette,merged=webp')
+parser.add_argument('--cache-dir', metavar='DIR', default=None, help='磁盘渲染缓存目录 (默认为程序所在目录下的.render-cache)')
+parser.add_argument('--no-cache', action='store_true', help='不使用磁盘渲染缓存')
+parser.add_argument('--overview', metavar='PX', type=int, default=None, help='总览模式: 合并相邻K线使图像宽度不超过PX像素')
+parser.add_argument('--max-height', metavar='PX', type=int, default=None, help='限高模式: 按整齐的分数步长量化K线，使图像高度不超过PX像素')
+parser.add_argument('--animate', default=None, choices=asset.encoding.ANIMATION_FORMATS, help='回放动画: K线逐根出现 (管道模式下写入标准输出，rgba为原始帧序列)')
+parser.add_argument('--frame-duration', metavar='MS', type=int, default=100, help='回放动画每帧的时长 (毫秒)')
+parser.add_argument('--keep-range', action='store_true', help='回放动画从第一帧起使用整体的分数范围 (不随最高分下移)')
+parser.add_argument('--theme', metavar='SPEC', action='append', default=None, help='多主题渲染 (可重复): 名称[:选项=值,...]，选项为 green_up、arrow、green、red、font_color，如 intl:green_up=true；输出文件名为 名称-主题名')
+parser.add_argument('--backend', default=None, choices=asset.CandleGraphicsResources.BACKENDS, help='K线层的绘制后端 (默认为 assets.candlestick.backend)')
+parser.add_argument('--profile', metavar='FILE', default=None, help='记录各阶段的耗时、调用次数与缓存命中率，结束时写入JSON文件')
+parser.add_argument('--profile-memory', action='store_true', help='分析时同时用tracemalloc记录Python内存分配 (较慢)')
+args = parser.parse_args()
+
+try:
+    formats = asset.encoding.parse_formats(args.format, asset.batch.ARTIFACTS)
+except ValueError as e:
+    parser.error(str(e))
+CANDLE_FILENAMES = asset.batch.artifact_filenames(CANDLE_NAME, formats)
+
+try:
+    themes = [asset.parse_theme(spec) for spec in args.theme or ()]
+except ValueError as e:
+    parser.error(str(e))
+
+if args.backend is not None:
+    asset.CandleGraphicsResources.backend = args.backend
+
+cache = None if args.no_cache else asset.RenderCache(args.cache_dir or asset.utils.get_executable_directory('.render-cache'))
+
+if args.profile:
+    if cache is not None:
+        asset.Profiler.add_source('render_cache', lambda: {'hits': cache.hits, 'misses': cache.misses})
+    asset.Profiler.enable(memory=args.profile_memory)
+    # sys.exit时同样写入
+    atexit.register(asset.Profiler.dump, args.profile)
+
+
+if args.animate is not None and args.batch is not None:
+    parser.error('--animate cannot be used with --batch')
+if themes and (args.batch is not None or args.pipe is not None or args.animate is not None):
+    parser.error('--theme cannot be used with --batch, --pipe or --animate')
+
+
+if args.pipe is not None:
+    # 管道模式下标准输出只写入图像，错误信息写入标准错误
+    try:
+        if args.animate is not None:
+            asset.batch.render_animation(io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8'), sys.stdout.buffer, args.animate, args.frame_duration, args.overview, args.max_height, args.keep_range)
+            sys.exit(0)
+        asset.batch.render_stream(io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8'), sys.stdout.buffer, args.pipe, formats[args.pipe], cache, args.overview, args.max_height)
+    except Exception as e:
+        print(e, file=sys.stderr)
+        sys.exit(-1)
+    sys.exit(0)
+
+
+if args.batch is not None:
+    try:
+        inputs = asset.batch.collect_inputs(args.batch)
+    except Exception as e:
+        print(e, file=sys.stderr)
+        sys.exit(-1)
+    result = asset.batch.render_batch(inputs, args.output or asset.utils.get_executable_directory(), args.jobs, cache, formats, args.overview, args.max_height)
+    if cache is not None:
+        cache.trim()
+    for csv_file, paths in result.outputs.items():
+        print(f'{csv_file}: {paths["merged"]}')
+    for csv_file, error in result.errors.items():
+        print(f'{csv_file}: {error}', file=sys.stderr)
+    print(f'{len(result.outputs)}/{len(result)}')
+    sys.exit(0 if result.ok else 1)
+
+
 try:
-    argv1 = (sys.argv[1] if len(sys.argv) > 1 else '').lower().strip()
-    csv_file = argv1 if argv1 and argv1.endswith('.csv') else CANDLE_FILEPATHS['csv']
+    argv1 = args.csv.strip()
+    csv_file = argv1 if argv1 and argv1.lower().endswith('.csv') else CANDLE_FILEPATHS['csv']
     if not os.path.exists(csv_file):
         filepath = get_file()
         if not filepath:
             message_box(i18n['please-precreate'].format(csv=CANDLE_FILENAMES['csv']))
             sys.exit(1)
-        group = asset.CandleGroup(csv_file=filepath)
-    else: group = asset.CandleGroup(csv_file=csv_file)
-    group.check_error()
-    candlestick, number, merged, coord, horizontal = group.merged_tuple
-    candlestick.save(CANDLE_FILEPATHS['candlestick'])
-    number.save(CANDLE_FILEPATHS['number'])
-    merged.save(CANDLE_FILEPATHS['merged'])
-    coord.save(CANDLE_FILEPATHS['coord'])
-    horizontal.save(CANDLE_FILEPATHS['horizontal'])
+        csv_file = filepath
+    if args.animate is not None:
+        animation_file = asset.utils.get_executable_directory(f'{CANDLE_NAME}-animation{asset.encoding.ANIMATION_FORMATS[args.animate]}')
+        with open(animation_file, 'wb') as f:
+            asset.batch.render_animation(csv_file, f, args.animate, args.frame_duration, args.overview, args.max_height, args.keep_range)
+        message_box(animation_file)
+        sys.exit(0)
+    if themes:
+        paths = asset.batch.render_themes_file(csv_file, asset.utils.get_executable_directory(), themes, CANDLE_NAME, args.jobs, formats, args.overview, args.max_height)
+        message_box('\n'.join(theme_paths['merged'] for theme_paths in paths.values()))
+        sys.exit(0)
+    asset.batch.render_file(csv_file, asset.utils.get_executable_directory(), CANDLE_NAME, cache, args.jobs, formats, args.overview, args.max_height)
+    if cache is not None:
+        cache.trim()
     message_box(i18n['success'].format(**CANDLE_FILENAMES))
 except Exception as e:
     import traceback
@@ -1,7 +1,12 @@
 from asset.items import ItemGraphicsFactory
 from asset.candle import *
 from asset.number import *
+from asset.cache import RenderCache
+from asset.profiler import Profiler
 from asset import utils
+from asset import encoding
+from asset import batch
+from asset import profiler
 
 
 def asset_init():
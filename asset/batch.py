@@ -0,0 +1,389 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Iterable, Mapping
+from asset.candle import CandleAnimation, CandleGroup, CandlePyramid, CandleSeries, Theme, render_themes
+from asset.cache import RenderCache
+from asset.encoding import EncodeOptions, encode_all, get_options
+from asset.number import NumberGraphicsResources
+from asset.profiler import Profiler, instrument, profiled
+import glob
+import sys
+import os
+
+
+# 每个CSV输入对应的输出文件后缀 (与app.py的CANDLE_FILENAMES一致)
+FILENAME_SUFFIXES = {
+    'csv': '.csv',
+    'candlestick': '.png',
+    'number': '-number.png',
+    'merged': '-merged.png',
+    'coord': '-coord.png',
+    'horizontal': '-horizontal.png',
+}
+
+ARTIFACTS = CandleGroup.ARTIFACTS
+
+MANIFEST_COMMENT = '#'
+
+
+def artifact_filenames(
+    name: str,
+    formats: Mapping[str, str | EncodeOptions] | str | EncodeOptions | None = None
+) -> dict[str, str]:
+    """
+    以name为前缀的各输出文件名 (扩展名随编码格式)
+
+    :param name: 文件名前缀 (如 assets.candlestick.name 或CSV文件名)
+    :param formats: 每张图像的编码参数，或统一的编码参数
+    """
+    filenames = {artifact: f'{name}{suffix}' for artifact, suffix in FILENAME_SUFFIXES.items()}
+    for artifact, options in _formats(formats).items():
+        filenames[artifact] = filenames[artifact].removesuffix('.png') + options.extension
+    return filenames
+
+
+def collect_inputs(source: str) -> list[str]:
+    """
+    展开批量输入
+
+    - 目录: 目录下的所有CSV文件 (不递归)
+    - 通配符: 匹配的所有CSV文件 (支持`**`)
+    - CSV文件: 该文件本身
+    - 其它文件: 视为清单，每行一个CSV路径 (相对路径以清单所在目录为准，`#`开头为注释)
+
+    :param source: 目录、通配符、CSV文件或清单文件
+    """
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, filename) for filename in os.listdir(source)
+            if filename.lower().endswith('.csv') and os.path.isfile(os.path.join(source, filename))
+        )
+    if any(char in source for char in '*?['):
+        return sorted(path for path in glob.glob(source, recursive=True) if path.lower().endswith('.csv') and os.path.isfile(path))
+    if not os.path.isfile(source):
+        raise FileNotFoundError(f"Batch input not found: {source}")
+    if source.lower().endswith('.csv'):
+        return [source]
+    directory = os.path.dirname(source)
+    inputs: list[str] = []
+    with open(source, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(MANIFEST_COMMENT):
+                continue
+            inputs.append(os.path.join(directory, os.path.expanduser(line)))
+    return inputs
+
+
+def _formats(formats: Mapping[str, str | EncodeOptions] | str | EncodeOptions | None) -> dict[str, EncodeOptions]:
+    """
+    每张图像的编码参数 (未给定的图像为PNG默认编码)
+    """
+    if isinstance(formats, Mapping):
+        return {artifact: get_options(formats.get(artifact)) for artifact in ARTIFACTS}
+    return {artifact: get_options(formats) for artifact in ARTIFACTS}
+
+
+def overview_series(series: CandleSeries, width: int | None) -> CandleSeries:
+    """
+    总览模式: 合并相邻K线使图像宽度不超过width像素 (先检查原始数据)
+
+    :param width: 目标宽度 (为None时返回原序列)
+    """
+    if width is None:
+        return series
+    CandleGroup(series=series).check_error()
+    return CandlePyramid(series).fit(width)[1]
+
+
+def series_step(series: CandleSeries, height: int | None) -> int:
+    """
+    限高模式: 使大图像高度不超过height像素的分数步长 (见CandleGroup.bounded)
+
+    :param height: 最大高度 (为None时为1)
+    """
+    if height is None:
+        return 1
+    return CandleGroup.fit_step(series.y_max, series.y_min, height - 4 * NumberGraphicsResources.max_height)
+
+
+def _cache_key(cache: RenderCache, series: CandleSeries, formats: dict[str, EncodeOptions], step: int) -> str:
+    """
+    整组结果在磁盘缓存中的键 (只取其中部分图像时也使用同一条目)
+    """
+    return cache.key(series, repr(sorted(formats.items())), *([f'step={step}'] if step != 1 else []))
+
+
+@profiled()
+def render_series(
+    series: CandleSeries,
+    formats: Mapping[str, str | EncodeOptions] | str | EncodeOptions | None = None,
+    cache: RenderCache | None = None,
+    jobs: int | None = None,
+    width: int | None = None,
+    height: int | None = None
+) -> dict[str, bytes]:
+    """
+    渲染并编码全部图像，返回编码后的字节
+
+    给定缓存时，命中则直接读取已编码的文件 (跳过渲染与编码)
+
+    :param formats: 每张图像的编码参数，或统一的编码参数
+    :param cache: 磁盘渲染缓存
+    :param jobs: 并行渲染的线程数
+    :param width: 总览模式的目标宽度 (像素，默认每根K线单独绘制)
+    :param height: 限高模式的最大高度 (像素，默认每分一个像素行)
+    """
+    formats = _formats(formats)
+    series = overview_series(series, width)
+    step = series_step(series, height)
+    if cache is None:
+        group = CandleGroup(series=series, jobs=jobs, step=step)
+        group.check_error()
+        return group.export(formats)
+    key = _cache_key(cache, series, formats, step)
+    filenames = {artifact: f'{artifact}{options.extension}' for artifact, options in formats.items()}
+    cached = cache.artifacts(key, filenames.values())
+    if cached is not None:
+        encoded: dict[str, bytes] = {}
+        for artifact, filename in filenames.items():
+            with open(cached[filename], 'rb') as f:
+                encoded[artifact] = f.read()
+        return encoded
+    group = CandleGroup(series=series, jobs=jobs, cache=cache, step=step)
+    group.check_error()
+    encoded = group.export(formats)
+    cache.store_artifacts(key, {filenames[artifact]: data for artifact, data in encoded.items()})
+    return encoded
+
+
+@profiled()
+def render_file(
+    csv_file: str,
+    out_dir: str,
+    name: str | None = None,
+    cache: RenderCache | None = None,
+    jobs: int | None = None,
+    formats: Mapping[str, str | EncodeOptions] | str | EncodeOptions | None = None,
+    width: int | None = None,
+    height: int | None = None
+) -> dict[str, str]:
+    """
+    渲染单个CSV文件并保存全部图像，返回各图像的保存路径
+
+    :param csv_file: CSV文件路径
+    :param out_dir: 输出目录
+    :param name: 输出文件名前缀 (默认为CSV文件名)
+    :param cache: 磁盘渲染缓存
+    :param jobs: 单个文件内并行渲染的线程数
+    :param formats: 每张图像的编码参数，或统一的编码参数
+    :param width: 总览模式的目标宽度 (像素)
+    :param height: 限高模式的最大高度 (像素)
+    """
+    if name is None:
+        name = os.path.splitext(os.path.basename(csv_file))[0]
+    filenames = artifact_filenames(name, formats)
+    paths: dict[str, str] = {}
+    encoded = render_series(CandleSeries.from_csv(csv_file), formats, cache, jobs, width, height)
+    with Profiler.stage('batch.write'):
+        for artifact, data in encoded.items():
+            paths[artifact] = os.path.join(out_dir, filenames[artifact])
+            with open(paths[artifact], 'wb') as f:
+                f.write(data)
+    return paths
+
+
+@profiled()
+def render_themes_file(
+    csv_file: str,
+    out_dir: str,
+    themes: Iterable[Theme],
+    name: str | None = None,
+    jobs: int | None = None,
+    formats: Mapping[str, str | EncodeOptions] | str | EncodeOptions | None = None,
+    width: int | None = None,
+    height: int | None = None
+) -> dict[str, dict[str, str]]:
+    """
+    将单个CSV文件渲染为多个主题并保存 (文件名前缀为 `名称-主题名`)，返回主题名称 -> 各图像的保存路径
+
+    数据解析与布局只进行一次，主题间相同的图像只编码一次 (见asset.candle.ThemedRenderer)；
+    主题渲染不使用磁盘缓存
+
+    :param themes: 主题 (名称不可重复)
+    :param name: 输出文件名前缀 (默认为CSV文件名)
+    :param jobs: 并行渲染的线程数
+    :param formats: 每张图像的编码参数，或统一的编码参数
+    :param width: 总览模式的目标宽度 (像素)
+    :param height: 限高模式的最大高度 (像素)
+    """
+    if name is None:
+        name = os.path.splitext(os.path.basename(csv_file))[0]
+    formats = _formats(formats)
+    series = overview_series(CandleSeries.from_csv(csv_file), width)
+    group = CandleGroup(series=series, jobs=jobs, step=series_step(series, height))
+    group.check_error()
+    rendered = render_themes(group, themes, formats)
+    # (图像名称, 图像) -> 编码后的字节，主题间共享的图像对象只编码一次
+    encoded: dict[tuple[str, int], bytes] = {}
+    for images in rendered.values():
+        pending = {artifact: image for artifact, image in images.items() if (artifact, id(image)) not in encoded}
+        for artifact, data in encode_all(pending, formats, group._executor).items():
+            encoded[artifact, id(pending[artifact])] = data
+    paths: dict[str, dict[str, str]] = {}
+    with Profiler.stage('batch.write'):
+        for theme_name, images in rendered.items():
+            filenames = artifact_filenames(f'{name}-{theme_name}', formats)
+            paths[theme_name] = {}
+            for artifact, image in images.items():
+                paths[theme_name][artifact] = os.path.join(out_dir, filenames[artifact])
+                with open(paths[theme_name][artifact], 'wb') as f:
+                    f.write(encoded[artifact, id(image)])
+    return paths
+
+
+def render_stream(
+    source: IO[str],
+    target: IO[bytes],
+    artifact: str = 'merged',
+    format: str | EncodeOptions | None = None,
+    cache: RenderCache | None = None,
+    width: int | None = None,
+    height: int | None = None
+) -> None:
+    """
+    管道模式: 从文本流读取CSV，将一张图像写入二进制流
+
+    :param source: CSV文本流 (如标准输入)
+    :param target: 图像输出流 (如标准输出)
+    :param artifact: 输出的图像 (ARTIFACTS之一)
+    :param format: 编码参数 (默认为PNG默认编码)
+    :param cache: 磁盘渲染缓存
+    :param width: 总览模式的目标宽度 (像素)
+    :param height: 限高模式的最大高度 (像素)
+    """
+    if artifact not in ARTIFACTS:
+        raise ValueError(f"Invalid artifact: {artifact}")
+    series = overview_series(CandleSeries.from_csv(source), width)
+    if cache is None:
+        group = CandleGroup(series=series)
+        group.check_error()
+        if height is not None:
+            group = group.bounded(max_height=height)
+        group.export({artifact: format}, target)
+    else:
+        # 只查找、渲染并保存所需的一张图像 (与render_series共用缓存条目)
+        formats = _formats(format)
+        step = series_step(series, height)
+        key = _cache_key(cache, series, formats, step)
+        filename = f'{artifact}{formats[artifact].extension}'
+        cached = cache.artifacts(key, (filename,))
+        if cached is not None:
+            with open(cached[filename], 'rb') as f:
+                data = f.read()
+        else:
+            group = CandleGroup(series=series, cache=cache, step=step)
+            group.check_error()
+            data = group.export({artifact: formats[artifact]})[artifact]
+            cache.store_artifacts(key, {filename: data})
+        target.write(data)
+    target.flush()
+
+
+@profiled()
+def render_animation(
+    source: str | IO[str],
+    target: IO[bytes],
+    format: str = 'apng',
+    duration: int = 100,
+    width: int | None = None,
+    height: int | None = None,
+    keep_range: bool = False
+) -> None:
+    """
+    回放动画: K线逐根出现，增量帧流式写入 (见CandleAnimation)
+
+    :param source: CSV文件路径或文本流
+    :param target: 动画输出流
+    :param format: 'apng'、'gif' 或 'rgba' (原始帧序列)
+    :param duration: 每帧的时长 (毫秒)
+    :param width: 总览模式的目标宽度 (像素)
+    :param height: 限高模式的最大高度 (像素)
+    :param keep_range: 是否从第一帧起使用整体的分数范围
+    """
+    series = overview_series(CandleSeries.from_csv(source), width)
+    group = CandleGroup(series=series, step=series_step(series, height))
+    group.check_error()
+    CandleAnimation(group, keep_range=keep_range).save(target, format, duration)
+    target.flush()
+
+
+class BatchResult:
+    """
+    批量渲染结果
+
+    outputs: 成功的输入 -> 各图像的保存路径
+    errors: 失败的输入 -> 异常
+    """
+
+    def __init__(self) -> None:
+        self.outputs: dict[str, dict[str, str]] = {}
+        self.errors: dict[str, Exception] = {}
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def __len__(self) -> int:
+        return len(self.outputs) + len(self.errors)
+
+
+def render_batch(
+    inputs: Iterable[str],
+    out_dir: str,
+    jobs: int | None = None,
+    cache: RenderCache | None = None,
+    formats: Mapping[str, str | EncodeOptions] | str | EncodeOptions | None = None,
+    width: int | None = None,
+    height: int | None = None
+) -> BatchResult:
+    """
+    在同一进程内批量渲染多个CSV文件 (复用已初始化的资源)，单个文件失败不影响其它文件
+
+    输出文件以CSV文件名为前缀保存到out_dir，文件名重复的输入记为失败
+
+    :param inputs: CSV文件路径
+    :param out_dir: 输出目录 (不存在时创建)
+    :param jobs: 工作线程数 (默认为ThreadPoolExecutor的默认线程数)
+    :param cache: 磁盘渲染缓存
+    :param formats: 每张图像的编码参数，或统一的编码参数
+    :param width: 总览模式的目标宽度 (像素)
+    :param height: 限高模式的最大高度 (像素)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    result = BatchResult()
+    names: dict[str, str] = {}
+    tasks: dict[str, str] = {}
+    for csv_file in inputs:
+        name = os.path.splitext(os.path.basename(csv_file))[0]
+        if name.lower() in names: # 大小写不敏感的文件系统上同样会覆盖
+            result.errors[csv_file] = ValueError(f"Duplicate output name: {name} (already used by {names[name.lower()]})")
+            continue
+        names[name.lower()] = csv_file
+        tasks[csv_file] = name
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="batch") as executor:
+        futures = {
+            csv_file: executor.submit(render_file, csv_file, out_dir, name, cache, None, formats, width, height)
+            for csv_file, name in tasks.items()
+        }
+        for csv_file, future in futures.items():
+            try:
+                result.outputs[csv_file] = future.result()
+            except Exception as e:
+                result.errors[csv_file] = e
+    return result
+
+
+instrument(sys.modules[__name__])
+
+
+__all__ = ["ARTIFACTS", "BatchResult", "artifact_filenames", "collect_inputs", "overview_series", "series_step", "render_series", "render_file", "render_themes_file", "render_stream", "render_animation", "render_batch"]
@@ -0,0 +1,244 @@
+from typing import Callable, Iterable, Mapping
+from PIL import Image, PngImagePlugin
+from asset import utils
+import threading
+import tempfile
+import hashlib
+import shutil
+import time
+import os
+
+
+# 渲染逻辑变化(输出像素可能不同)时递增，使旧缓存全部失效
+CACHE_VERSION = 1
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class RenderCache:
+    """
+    磁盘上的内容寻址渲染缓存 (跨进程共享)
+
+    - artifacts/: 整组结果图像 (已编码的文件)，键为K线数据与资源指纹的哈希，命中时跳过渲染与编码
+    - sprites/: 单根K线的数值图像，键为开高低收与资源指纹的哈希，部分变化的序列可复用大部分数值图像
+
+    K线柱图像不写入磁盘: 其冷渲染(约0.3ms)比PNG解码(约0.6ms)更快，由进程内的LRU缓存负责
+
+    写入先落到临时文件再原子替换，多个进程可同时使用同一目录；
+    按修改时间淘汰 (命中时刷新)，总大小超过max_bytes时由trim()删除最久未使用的条目
+    """
+    ARTIFACTS_DIR = 'artifacts'
+    SPRITES_DIR = 'sprites'
+    OFFSET_KEY = 'offset'
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES, fingerprint: str | None = None):
+        """
+        :param directory: 缓存目录 (不存在时创建)
+        :param max_bytes: 缓存总大小上限 (字节)
+        :param fingerprint: 资源指纹 (默认为 asset_fingerprint())
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.fingerprint = fingerprint or self.asset_fingerprint()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        for name in (self.ARTIFACTS_DIR, self.SPRITES_DIR):
+            os.makedirs(os.path.join(directory, name), exist_ok=True)
+
+    @staticmethod
+    def asset_fingerprint(assets_folder: str | None = None) -> str:
+        """
+        资源指纹: assets目录下所有文件(配置json、精灵图、字体、i18n)的内容哈希，
+        以及影响输出的运行环境 (语言、时区、缓存版本)
+
+        :param assets_folder: 资源目录 (默认为程序所在目录下的assets)
+        """
+        if assets_folder is None:
+            assets_folder = utils.get_executable_directory('assets')
+        digest = hashlib.sha256(f'{CACHE_VERSION}|{utils.current_locale}|{time.timezone}|{time.altzone}|{time.tzname}'.encode())
+        for root, dirs, files in os.walk(assets_folder):
+            dirs.sort()
+            for file in sorted(files):
+                path = os.path.join(root, file)
+                digest.update(os.path.relpath(path, assets_folder).replace(os.sep, '/').encode())
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b''):
+                        digest.update(chunk)
+        return digest.hexdigest()
+
+    def _digest(self, *parts: bytes | str) -> str:
+        digest = hashlib.sha256(self.fingerprint.encode())
+        for part in parts:
+            digest.update(b'|')
+            digest.update(part.encode() if isinstance(part, str) else part)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _shard(folder: str, key: str) -> str:
+        return os.path.join(folder, key[:2], key)
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def key(self, series, *extra: str) -> str:
+        """
+        整组结果的键: K线数据(各列的int64字节) + 资源指纹
+
+        :param series: CandleSeries
+        :param extra: 其它影响输出的参数
+        """
+        return self._digest(*(column.tobytes() for column in series.columns), *extra)
+
+    def artifacts(self, key: str, filenames: Iterable[str]) -> dict[str, str] | None:
+        """
+        查找整组结果，全部存在时返回各文件在缓存中的路径 (并刷新修改时间)
+
+        :param filenames: 条目内的文件名 (如 merged.png)
+        """
+        folder = self._shard(os.path.join(self.directory, self.ARTIFACTS_DIR), key)
+        paths = {filename: os.path.join(folder, filename) for filename in filenames}
+        if not all(os.path.isfile(path) for path in paths.values()):
+            self._count(False)
+            return None
+        try:
+            os.utime(folder)
+        except OSError:
+            pass
+        self._count(True)
+        return paths
+
+    def store_artifacts(self, key: str, files: Mapping[str, bytes]) -> dict[str, str]:
+        """
+        保存整组已编码的结果，返回各文件在缓存中的路径
+
+        先写入临时目录再整体重命名；条目已存在(其它进程先写入，或只保存了部分图像)时保留已有文件，
+        逐个原子地补充缺少的文件
+
+        :param files: 文件名 -> 编码后的字节
+        """
+        folder = self._shard(os.path.join(self.directory, self.ARTIFACTS_DIR), key)
+        os.makedirs(os.path.dirname(folder), exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.tmp-', dir=os.path.dirname(folder))
+        try:
+            for filename, data in files.items():
+                with open(os.path.join(staging, filename), 'wb') as f:
+                    f.write(data)
+            try:
+                os.rename(staging, folder)
+            except OSError:
+                if not os.path.isdir(folder):
+                    raise
+                for filename in files:
+                    if not os.path.isfile(os.path.join(folder, filename)):
+                        os.replace(os.path.join(staging, filename), os.path.join(folder, filename))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return {filename: os.path.join(folder, filename) for filename in files}
+
+    def sprite(self, params: tuple, factory: Callable[[], tuple[Image.Image, int]]) -> tuple[Image.Image, int]:
+        """
+        单根K线的数值图像及其纵向偏移，未命中时调用factory创建并写入磁盘
+
+        :param params: 决定图像内容的参数 (如开高低收)
+        """
+        path = self._shard(os.path.join(self.directory, self.SPRITES_DIR), self._digest(repr(params))) + '.png'
+        try:
+            with Image.open(path) as image:
+                image.load()
+                offset = int(image.text[self.OFFSET_KEY])
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self._count(True)
+            return image, offset
+        except (OSError, KeyError, ValueError):
+            pass
+        self._count(False)
+        image, offset = factory()
+        info = PngImagePlugin.PngInfo()
+        info.add_text(self.OFFSET_KEY, str(offset))
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp = tempfile.mkstemp(prefix='.tmp-', suffix='.png', dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                image.save(f, format='PNG', pnginfo=info, compress_level=1)
+            os.replace(temp, path)
+        except OSError:
+            pass # 缓存写入失败不影响渲染
+        return image, offset
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """
+        所有条目 (修改时间, 大小, 路径)，整组结果以目录为单位
+        """
+        entries: list[tuple[float, int, str]] = []
+        artifacts = os.path.join(self.directory, self.ARTIFACTS_DIR)
+        sprites = os.path.join(self.directory, self.SPRITES_DIR)
+        for shard in os.scandir(artifacts):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_dir() and not entry.name.startswith('.tmp-'):
+                    size = sum(file.stat().st_size for file in os.scandir(entry.path))
+                    entries.append((entry.stat().st_mtime, size, entry.path))
+        for shard in os.scandir(sprites):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and not entry.name.startswith('.tmp-'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def size(self) -> int:
+        """
+        缓存总大小 (字节)
+        """
+        return sum(size for _, size, _ in self._entries())
+
+    def trim(self, max_bytes: int | None = None) -> int:
+        """
+        删除最久未使用的条目，直到总大小不超过max_bytes，返回删除的字节数
+
+        :param max_bytes: 大小上限 (默认为构造时的max_bytes)
+        """
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total - removed <= max_bytes:
+                break
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+            removed += size
+        return removed
+
+    def clear(self) -> None:
+        self.trim(0)
+
+    def info(self) -> dict[str, int]:
+        """
+        命中统计
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": self.size(),
+            "max_bytes": self.max_bytes,
+        }
+
+
+__all__ = ["RenderCache", "CACHE_VERSION", "DEFAULT_MAX_BYTES"]
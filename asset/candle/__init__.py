@@ -1,5 +1,10 @@
 from ._candle import Candle
 from ._group import CandleGroup
-from ._resources import CandleGraphicsResources
+from ._series import CandleSeries
+from ._resources import CandleGraphicsResources, CandleStyle
 from ._enum import CandleErrorStatus
-from ._structure import CandleStructure
\ No newline at end of file
+from ._structure import CandleStructure
+from ._pyramid import CandlePyramid
+from ._aggregate import CandleAggregator, TimeInterval, CountInterval, SessionInterval, parse_interval, read_events, aggregate_events
+from ._animation import Frame, CandleAnimation
+from ._theme import Theme, parse_theme, resolve_theme, ThemedRenderer, render_themes
\ No newline at end of file
@@ -0,0 +1,308 @@
+from typing import IO, Iterable, Iterator, NamedTuple, Protocol
+import contextlib
+import datetime
+import csv
+import re
+from ._candle import Candle, _to_int
+from ._timestamp import TimestampFormat, _guess, _parser, parse_timestamp
+
+
+class Interval(Protocol):
+    """
+    K线的划分方式
+
+    key: 事件所属区间的键 (随事件单调不减的整数)
+    start: 区间对应K线的时间戳
+    following: 下一个区间的键 (用于填充空区间，不存在空区间的划分方式为None)
+    """
+
+    def key(self, timestamp: int, index: int, previous: int | None, current: int | None) -> int: ...
+
+    def start(self, key: int, first: int) -> int: ...
+
+    def following(self, key: int) -> int | None: ...
+
+
+class TimeInterval(NamedTuple):
+    """
+    按固定时长划分 (每小时、每天等)，区间按tz的本地时间(墙上时间)对齐
+
+    整天的倍数从本地零点开始 (按日期序数对齐)，短于一天的在每个本地日内从零点开始划分；
+    夏令时切换的那天按实际的墙上时间划分 (重复的一小时以fold区分)
+
+    :param seconds: 区间时长 (秒)
+    :param tz: 对齐的时区 (默认为本地时区)
+    """
+    seconds: int
+    tz: datetime.tzinfo | None = None
+
+    def key(self, timestamp: int, index: int, previous: int | None, current: int | None) -> int:
+        local = datetime.datetime.fromtimestamp(timestamp, self.tz)
+        if self.seconds % 86400 == 0:
+            days = self.seconds // 86400
+            date = datetime.date.fromordinal(local.toordinal() // days * days)
+            return int(datetime.datetime.combine(date, datetime.time.min, self.tz).timestamp())
+        wall = local.hour * 3600 + local.minute * 60 + local.second
+        start = local.replace(hour=0, minute=0, second=0, microsecond=0) + datetime.timedelta(seconds=wall // self.seconds * self.seconds)
+        return int(start.replace(fold=local.fold).timestamp())
+
+    def start(self, key: int, first: int) -> int:
+        return key
+
+    def following(self, key: int) -> int:
+        # 夏令时切换的那天可能为23或25小时，按小时步进直到进入下一个区间
+        candidate = key + self.seconds
+        while self.key(candidate, 0, None, None) <= key:
+            candidate += min(self.seconds, 3600)
+        return self.key(candidate, 0, None, None)
+
+
+class CountInterval(NamedTuple):
+    """
+    按事件数划分 (如每10场对局)，K线时间戳为区间内第一个事件的时间
+
+    :param count: 每根K线的事件数
+    """
+    count: int
+
+    def key(self, timestamp: int, index: int, previous: int | None, current: int | None) -> int:
+        return index // self.count
+
+    def start(self, key: int, first: int) -> int:
+        return first
+
+    def following(self, key: int) -> None:
+        return None
+
+
+class SessionInterval(NamedTuple):
+    """
+    按会话划分: 相邻事件间隔超过idle秒时开始新的K线，K线时间戳为会话内第一个事件的时间
+
+    :param idle: 会话间的最短空闲时长 (秒)
+    """
+    idle: int
+
+    def key(self, timestamp: int, index: int, previous: int | None, current: int | None) -> int:
+        if current is None:
+            return 0
+        return current + 1 if previous is not None and timestamp - previous > self.idle else current
+
+    def start(self, key: int, first: int) -> int:
+        return first
+
+    def following(self, key: int) -> None:
+        return None
+
+
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def parse_duration(text: str) -> int:
+    """
+    解析时长 (如 `30m`、`1h`、`1d`，不带单位为秒)
+    """
+    match = re.fullmatch(r'\s*(\d+)\s*([smhdw]?)\s*', text.lower())
+    if match is None or int(match.group(1)) <= 0:
+        raise ValueError(f"Invalid duration: {text}")
+    return int(match.group(1)) * DURATION_UNITS[match.group(2) or 's']
+
+
+def parse_interval(spec: str, tz: datetime.tzinfo | None = None) -> Interval:
+    """
+    解析划分方式: `1h`/`1d`等时长、`count:10` (每10个事件)、`session:30m` (空闲30分钟分为新会话)
+
+    :param tz: 时长划分的对齐时区 (默认为本地时区)
+    """
+    kind, _, value = spec.strip().rpartition(':')
+    match kind.lower():
+        case '':
+            return TimeInterval(parse_duration(value), tz)
+        case 'count':
+            if not value.isdigit() or int(value) <= 0:
+                raise ValueError(f"Invalid interval: {spec}")
+            return CountInterval(int(value))
+        case 'session':
+            return SessionInterval(parse_duration(value))
+        case _:
+            raise ValueError(f"Invalid interval: {spec}")
+
+
+class CandleAggregator:
+    """
+    将逐个的分数事件(timestamp, score)流式聚合为K线 (常量内存: 只保存当前区间的开高低收)
+
+    - 开盘为上一根K线的收盘 (分数是连续的)，第一根K线为initial或区间内的第一个分数；高低包含开盘
+    - 事件按到达顺序决定收盘，区间内的时间乱序不影响结果
+    - 时长划分下没有事件的区间默认跳过，fill_gaps时补为开高低收都等于上一收盘的K线
+    - 早于当前区间的迟到事件默认抛出ValueError，drop_late时丢弃并计入dropped
+    """
+
+    def __init__(
+        self,
+        interval: Interval,
+        *,
+        initial: int | None = None,
+        delta: bool = False,
+        fill_gaps: bool = False,
+        drop_late: bool = False
+    ):
+        """
+        :param interval: 划分方式
+        :param initial: 第一根K线的开盘分 (默认为第一个分数)
+        :param delta: 事件的分数为变化量 (从initial或0开始累加)
+        :param fill_gaps: 用平盘K线填充没有事件的区间
+        :param drop_late: 丢弃迟到事件而不是抛出异常
+        """
+        self.interval = interval
+        self.delta = delta
+        self.fill_gaps = fill_gaps
+        self.drop_late = drop_late
+        self.dropped = 0
+        self._score = initial or 0
+        self._close = initial
+        self._index = 0
+        self._previous: int | None = None
+        self._key: int | None = None
+        self._end: int | None = None
+        self._first = 0
+        self._ohlc: list[int] | None = None
+
+    def _candle(self, key: int, first: int, ohlc: list[int]) -> Candle:
+        open, high, low, close = ohlc
+        return Candle.model_construct(timestamp=self.interval.start(key, first), open=open, high=high, low=low, close=close)
+
+    def add(self, timestamp: int, score: int) -> list[Candle]:
+        """
+        加入一个事件，返回因此完成的K线 (包括填充的空区间，通常为空列表)
+        """
+        completed: list[Candle] = []
+        timestamp = _to_int('timestamp', timestamp)
+        score = _to_int('score', score)
+        if self._end is not None and self._key <= timestamp < self._end:
+            key = self._key # 仍在当前时长区间内，无需换算时区
+        else:
+            key = self.interval.key(timestamp, self._index, self._previous, self._key)
+        if self._key is not None and key < self._key:
+            if self.drop_late:
+                self.dropped += 1
+                return completed
+            raise ValueError(f"Late event at {timestamp} (current candle starts at {self.interval.start(self._key, self._first)})")
+        self._index += 1
+        self._previous = timestamp
+        if self.delta:
+            self._score += score
+            score = self._score
+        if key != self._key or self._ohlc is None:
+            if self._ohlc is not None:
+                completed.append(self._candle(self._key, self._first, self._ohlc))
+                if self.fill_gaps:
+                    close = self._ohlc[3]
+                    gap = self.interval.following(self._key)
+                    while gap is not None and gap < key:
+                        completed.append(self._candle(gap, gap, [close, close, close, close]))
+                        gap = self.interval.following(gap)
+            open = score if self._close is None else self._close
+            self._key, self._first = key, timestamp
+            self._end = self.interval.following(key)
+            self._ohlc = [open, max(open, score), min(open, score), score]
+        else:
+            ohlc = self._ohlc
+            if score > ohlc[1]:
+                ohlc[1] = score
+            elif score < ohlc[2]:
+                ohlc[2] = score
+            ohlc[3] = score
+        self._close = score
+        return completed
+
+    def flush(self) -> Candle | None:
+        """
+        结束当前(未完成的)区间并返回其K线，之后的事件从新的区间开始
+        """
+        if self._ohlc is None:
+            return None
+        candle = self._candle(self._key, self._first, self._ohlc)
+        self._ohlc = None
+        return candle
+
+    def __call__(self, events: Iterable[tuple[int, int]]) -> Iterator[Candle]:
+        """
+        聚合整个事件流 (结束时产出最后一根K线)
+        """
+        for timestamp, score in events:
+            yield from self.add(timestamp, score)
+        candle = self.flush()
+        if candle is not None:
+            yield candle
+
+
+def read_events(
+    source: str | IO[str],
+    *,
+    tz: datetime.tzinfo | None = None,
+    timestamp_format: TimestampFormat | None = None
+) -> Iterator[tuple[int, int]]:
+    """
+    逐行读取分数事件CSV (timestamp, score，可含标题行)，不会一次性读入整个文件
+
+    时间戳格式依据第一行检测一次 (与K线CSV相同的格式)，不匹配的行逐行检测
+
+    :param source: 文件路径或文本流
+    :param tz: 无时区时间的时区 (默认为本地时间)
+    :param timestamp_format: 指定时间戳格式 (默认自动检测)
+    """
+    if isinstance(source, str):
+        context = open(source, 'r', encoding='utf-8', newline='')
+    else:
+        context = contextlib.nullcontext(source)
+    with context as f:
+        parse = None if timestamp_format is None else _parser(timestamp_format, tz)
+        for line, row in enumerate(csv.reader(f), 1):
+            if len(row) < 2 or not row[0].strip():
+                continue
+            try:
+                score = int(row[1])
+            except ValueError as e:
+                if line == 1:
+                    continue # 标题行
+                raise ValueError(f"Invalid event at line {line}: {row}") from e
+            if parse is None:
+                fmt = _guess(row[0])
+                parse = _parser(fmt, tz) if fmt is not None else (lambda text: parse_timestamp(text, tz))
+            try:
+                timestamp = parse(row[0].strip())
+            except ValueError:
+                try:
+                    timestamp = parse_timestamp(row[0], tz)
+                except ValueError as e:
+                    raise ValueError(f"Invalid event at line {line}: {row}") from e
+            yield timestamp, score
+
+
+def aggregate_events(
+    events: str | IO[str] | Iterable[tuple[int, int]],
+    interval: Interval | str,
+    *,
+    tz: datetime.tzinfo | None = None,
+    **options
+) -> Iterator[Candle]:
+    """
+    将事件文件/流/迭代器聚合为K线
+
+    :param events: 事件CSV的路径或文本流，或 (timestamp, score) 的迭代器
+    :param interval: 划分方式，或parse_interval的字符串
+    :param tz: 时间的时区 (读取CSV与时长划分的对齐)
+    :param options: CandleAggregator的其它参数
+    """
+    if isinstance(interval, str):
+        interval = parse_interval(interval, tz)
+    if isinstance(events, str) or hasattr(events, 'read'):
+        events = read_events(events, tz=tz)
+    return CandleAggregator(interval, **options)(events)
+
+
+__all__ = [
+    "Interval", "TimeInterval", "CountInterval", "SessionInterval", "CandleAggregator",
+    "parse_duration", "parse_interval", "read_events", "aggregate_events",
+]
@@ -0,0 +1,116 @@
+from typing import IO, Iterator, NamedTuple
+from ._group import CandleGroup
+from ._layout import Box, intersect, union
+from ._resources import CandleGraphicsResources
+from asset.number import NumberGraphicsResources
+from asset.encoding import encode_animation
+from asset.profiler import instrument, profiled
+from PIL import Image
+
+
+class Frame(NamedTuple):
+    """
+    动画的一帧 (相对上一帧的增量)
+
+    :param box: 变化的矩形 (脏矩形，画布坐标)
+    :param image: 矩形内的像素 (RGBA)
+    """
+    box: Box
+    image: Image.Image
+
+
+@instrument
+class CandleAnimation:
+    """
+    K线逐根出现的回放动画: 第k帧在第k-1帧上追加第k根K线，每根K线的K线与数值只渲染一次
+
+    画布为最终的合并大图像的尺寸 (宽度与高度容纳全部K线)，每帧的内容从左上角开始；
+    最高分不变时每帧只更新新增K线(及其数值)的矩形；最高分升高时已有内容整体下移，该帧更新全部内容；
+    最低分降低不影响已有内容的位置。整个过程只保存两个图像层，帧以增量的形式逐个产出
+    """
+
+    def __init__(self, group: CandleGroup, *, keep_range: bool = False):
+        """
+        :param group: K线组 (沿用其渲染参数与量化步长，见CandleGroup.bounded)
+        :param keep_range: 是否从第一帧起使用整体的分数范围 (不再下移，总计算量与K线数成线性)
+        """
+        self.group = group
+        self.keep_range = keep_range
+
+    def __len__(self) -> int:
+        return len(self.group)
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """
+        画布尺寸 (与合并大图像相同)
+        """
+        return self.group.width, self.group.height + 4 * NumberGraphicsResources.max_height
+
+    @profiled()
+    def frames(self) -> Iterator[Frame]:
+        """
+        逐帧产出增量 (第一帧为第一根K线所在的矩形，之前的画布为全透明)
+        """
+        group = self.group
+        scale = CandleGraphicsResources.scale
+        offset = 2 * NumberGraphicsResources.max_height
+        size = self.size
+        canvas = (0, 0, *size)
+        candles = Image.new("RGBA", size)
+        numbers = Image.new("RGBA", size)
+        geometry = group.geometry
+        top = group.y_max if self.keep_range else None
+        right = 0
+        for index in range(len(group)):
+            candle = group.series[index]
+            shape = candle if group.step == 1 else geometry[index]
+            image, structure = group._draw_candle(shape)
+            if group.render_scale != scale:
+                image = image.resize((image.width * scale, image.height * scale), Image.Resampling.NEAREST)
+            number, y_offset = group._draw_number((candle, structure))
+            dirty: Box | None = None
+            if top is None or shape.high > top:
+                if top is not None:
+                    # 最高分升高: 已有内容整体下移
+                    shift = (shape.high - top) * scale
+                    candles, numbers = self._shift(candles, shift), self._shift(numbers, shift)
+                    dirty = (0, 0, right, size[1])
+                top = shape.high
+            x = index * (group.candle_width + group.spacing)
+            y = (top - shape.high) * scale + offset
+            candles.paste(image, (x, y))
+            numbers.paste(number, (x, y - y_offset))
+            rects = (x, y, x + image.width, y + image.height), (x, y - y_offset, x + number.width, y - y_offset + number.height)
+            right = max(right, min(size[0], max(rect[2] for rect in rects)))
+            dirty = intersect(union(dirty, *rects), canvas)
+            yield Frame(dirty, Image.alpha_composite(candles.crop(dirty), numbers.crop(dirty)))
+
+    @staticmethod
+    def _shift(layer: Image.Image, distance: int) -> Image.Image:
+        shifted = Image.new("RGBA", layer.size)
+        shifted.paste(layer, (0, distance))
+        return shifted
+
+    def images(self) -> Iterator[Image.Image]:
+        """
+        逐帧产出完整的画布 (同一个图像对象在之后的帧中被修改，需要保留时应复制)
+        """
+        canvas = Image.new("RGBA", self.size)
+        for frame in self.frames():
+            canvas.paste(frame.image, frame.box[:2])
+            yield canvas
+
+    def save(self, target: IO[bytes], format: str = 'apng', duration: int = 100, loop: int = 0) -> None:
+        """
+        流式编码为动画 (见asset.encoding.encode_animation)
+
+        :param target: 写入的二进制流
+        :param format: 'apng'、'gif' 或 'rgba' (原始帧序列)
+        :param duration: 每帧的时长 (毫秒)
+        :param loop: 循环次数 (0为无限循环)
+        """
+        encode_animation(self.frames(), self.size, len(self), target, format, duration, loop)
+
+
+__all__ = ["Frame", "CandleAnimation"]
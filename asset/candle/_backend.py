@@ -0,0 +1,121 @@
+from ._series import CandleSeries
+from ._resources import CandleGraphicsResources, CandleStyle
+from graphics import ArrayGraphics, LRUCache
+from asset.profiler import Profiler, instrument, profiled
+from PIL import Image
+import sys
+
+try:
+    import numpy as np
+except ImportError: # numpy为可选依赖，缺失时只能使用Pillow后端
+    np = None
+
+
+# 进程级的K线数组缓存: (素材, 缩放, 涨跌色, 结构三元组) -> 各部分的 (x, y, 数组)
+array_cache = LRUCache(256)
+
+
+def use_numpy() -> bool:
+    """
+    当前配置是否使用NumPy后端 (配置无效或缺少numpy时抛出ValueError)
+    """
+    backend = CandleGraphicsResources.backend
+    if backend not in CandleGraphicsResources.BACKENDS:
+        raise ValueError(f"Invalid backend {backend}")
+    if backend == 'numpy' and np is None:
+        raise ValueError("The numpy backend requires numpy")
+    return backend == 'numpy'
+
+
+def candle_arrays(
+    up_length: int,
+    body_length: int,
+    down_length: int,
+    scale: int,
+    style: CandleStyle | None = None
+) -> list[tuple[int, int, 'np.ndarray']]:
+    """
+    单根K线各部分的数组及其在K线图像内的位置 (与CandleGraphicsResources.gen_candle的像素一致，数组为共享的视图)
+
+    :param style: 素材与配色 (默认为配置文件的)
+    """
+    style = style or CandleGraphicsResources.style()
+    return array_cache.get_or_create(
+        (style.arrow, style.green, style.red, scale, style.green_up, up_length, body_length, down_length),
+        lambda: _candle_arrays(up_length, body_length, down_length, scale, style)
+    )
+
+
+def _candle_arrays(up_length: int, body_length: int, down_length: int, scale: int, style: CandleStyle) -> list[tuple[int, int, 'np.ndarray']]:
+    width = style.width
+    arrays = [
+        ArrayGraphics.to_array(CandleGraphicsResources.solid(source, scale, width)) if isinstance(source, str)
+        else ArrayGraphics.of(source).gen_array(length, scale=scale, direction=direction)
+        for source, length, direction in CandleGraphicsResources.candle_parts(up_length, body_length, down_length, style)
+    ]
+    # 与vertical_combine_images相同的水平居中、自上而下排列
+    width = max(array.shape[1] for array in arrays)
+    parts: list[tuple[int, int, np.ndarray]] = []
+    y = 0
+    for array in arrays:
+        parts.append(((width - array.shape[1]) // 2, y, array))
+        y += array.shape[0]
+    return parts
+
+
+def candle_image(up_length: int, body_length: int, down_length: int, scale: int, style: CandleStyle | None = None) -> Image.Image:
+    """
+    单根K线的图像 (与CandleGraphicsResources.gen_candle的像素一致，用于在已合成的图像层上追加K线)
+    """
+    parts = candle_arrays(up_length, body_length, down_length, scale, style)
+    canvas = np.zeros((sum(array.shape[0] for _, _, array in parts), max(x + array.shape[1] for x, _, array in parts), 4), dtype=np.uint8)
+    for x, y, array in parts:
+        canvas[y:y + array.shape[0], x:x + array.shape[1]] = array
+    return Image.fromarray(canvas)
+
+
+@profiled()
+def compose(
+    geometry: CandleSeries,
+    x_pitch: int,
+    y_indexes: list[int],
+    size: tuple[int, int],
+    scale: int,
+    style: CandleStyle | None = None
+) -> Image.Image:
+    """
+    在预分配的数组上以切片赋值摆放全部K线，最后一次性转为图像
+
+    逐个paste不带蒙版，K线图像(含透明部分)直接替换画布上的像素，且相邻K线的矩形互不重叠；
+    画布初始为全透明，只写入各部分的非空矩形即与之一致
+
+    :param geometry: 绘制所用的序列
+    :param x_pitch: 相邻K线的水平间距 (像素)
+    :param y_indexes: 每根K线顶部的纵坐标 (像素)
+    :param size: 画布尺寸
+    :param scale: 像分比例
+    :param style: 素材与配色 (默认为配置文件的)
+    """
+    style = style or CandleGraphicsResources.style()
+    canvas = np.zeros((size[1], size[0], 4), dtype=np.uint8)
+    lengths = (column.tolist() for column in (geometry.up_length, geometry.body_length, geometry.down_length))
+    for index, (up, body, down) in enumerate(zip(*lengths)):
+        x, y = index * x_pitch, y_indexes[index]
+        for dx, dy, array in candle_arrays(up, body, down, scale, style):
+            canvas[y + dy:y + dy + array.shape[0], x + dx:x + dx + array.shape[1]] = array
+    return Image.fromarray(canvas)
+
+
+@profiled()
+def upscale(image: Image.Image, scale: int) -> Image.Image:
+    """
+    最近邻放大整数倍 (与Image.resize(NEAREST)一致)
+    """
+    return Image.fromarray(ArrayGraphics.upscale(ArrayGraphics.to_array(image), scale))
+
+
+instrument(sys.modules[__name__])
+Profiler.add_source('array_sprites', array_cache.info)
+
+
+__all__ = ["use_numpy", "candle_arrays", "candle_image", "compose", "upscale"]
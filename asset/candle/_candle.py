@@ -1,18 +1,75 @@
 from PIL import Image
-from pydantic import BaseModel
-from ._resources import CandleGraphicsResources
+from typing import Any
+from ._resources import CandleGraphicsResources, CandleStyle
 from ._structure import CandleStructure
 from ._enum import CandleErrorStatus
 from asset.number import NumberGraphicsResources
+from asset.profiler import instrument, profiled
+
+
+def _to_int(name: str, value: Any) -> int:
+    """
+    校验并转换为整数 (接受整数、整数值的浮点数与整数字符串)
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid {name}: {value!r}")
+
+
+@instrument
+class Candle:
+    """
+    K线数据
+
+    构造时校验各字段为整数，可信数据(已校验的列式序列等)使用model_construct跳过校验
+    """
+    __slots__ = ('timestamp', 'open', 'high', 'low', 'close')
+    FIELDS = __slots__
 
-
-class Candle(BaseModel):
     timestamp: int
     open: int
     high: int
     low: int
     close: int
 
+    def __init__(self, *, timestamp: Any, open: Any, high: Any, low: Any, close: Any) -> None:
+        self.timestamp = _to_int('timestamp', timestamp)
+        self.open = _to_int('open', open)
+        self.high = _to_int('high', high)
+        self.low = _to_int('low', low)
+        self.close = _to_int('close', close)
+
+    @classmethod
+    def model_construct(cls, *, timestamp: int, open: int, high: int, low: int, close: int) -> 'Candle':
+        """
+        不经校验直接创建 (仅用于可信的整数数据)
+        """
+        candle = object.__new__(cls)
+        candle.timestamp = timestamp
+        candle.open = open
+        candle.high = high
+        candle.low = low
+        candle.close = close
+        return candle
+
+    def model_copy(self) -> 'Candle':
+        return self.model_construct(timestamp=self.timestamp, open=self.open, high=self.high, low=self.low, close=self.close)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Candle):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.FIELDS)
+
+    def __repr__(self) -> str:
+        return f"Candle({', '.join(f'{name}={getattr(self, name)}' for name in self.FIELDS)})"
+
     @property
     def up_length(self) -> int:
         return self.high - max(self.open, self.close)
@@ -35,7 +92,15 @@ class Candle(BaseModel):
 
     @property
     def color(self) -> str:
-        return self.should_up_check ^ CandleGraphicsResources.green_up and 'red' or (self.should_up == 0) and 'black' or 'green'
+        return self.color_for(CandleGraphicsResources.green_up)
+
+    def color_for(self, green_up: bool) -> str:
+        """
+        涨跌颜色
+
+        :param green_up: 是否为绿涨红跌(国际标准)
+        """
+        return self.should_up_check ^ green_up and 'red' or (self.should_up == 0) and 'black' or 'green'
 
     @property
     def check(self):
@@ -51,8 +116,8 @@ class Candle(BaseModel):
     def error_message(self):
         return f'{self.timestamp}: {CandleGraphicsResources.i18n.get(self.check.name, 'UNKNOWN')}'
 
-    def _draw_number(self, with_box: tuple[int | None, int | None] | None = None) -> Image.Image | tuple[Image.Image, Image.Image, Image.Image, Image.Image]:
-        color = self.color
+    def _draw_number(self, with_box: tuple[int | None, int | None] | None = None, color: str | None = None) -> Image.Image | tuple[Image.Image, Image.Image, Image.Image, Image.Image]:
+        color = color or self.color
         if self.body_length == 0 and self.should_up == 0 and self.up_length == 0 and self.down_length == 0:
             return NumberGraphicsResources.create_number(self.close, color, with_margin=True, with_box=with_box)
         return (
@@ -62,22 +127,25 @@ class Candle(BaseModel):
             NumberGraphicsResources.create_number(-self.close, color, with_margin=True, with_box=with_box)
         )
 
-    def draw_candle(self):
+    @profiled()
+    def draw_candle(self, scale: int | None = None, style: CandleStyle | None = None):
         """
         基于当前的K线数据绘制K线柱
 
-        :param green: 是否为绿涨红跌(国际标准)
+        :param scale: 像分比例 (默认为 assets.candlestick.scale)
+        :param style: 素材与配色 (默认为配置文件的)
         """
-        return CandleGraphicsResources.gen_candle(self.up_length, self.body_length, self.down_length)
+        return CandleGraphicsResources.gen_candle(self.up_length, self.body_length, self.down_length, scale, style)
 
-    def draw_number(self, structure: CandleStructure):
+    @profiled()
+    def draw_number(self, structure: CandleStructure, style: CandleStyle | None = None):
         """
         绘制K线柱的数值
 
         :param structure: 绘制参数
-        :param green: 是否为绿涨红跌(国际标准)
+        :param style: 素材与配色 (默认为配置文件的，数值的颜色随其涨跌色)
         """
-        images = self._draw_number(with_box=(None, None))
+        images = self._draw_number(with_box=(None, None), color=None if style is None else self.color_for(style.green_up))
         if isinstance(images, Image.Image):
             canvas = structure.empty_canvas
             return CandleGraphicsResources.vertical_combine_images(canvas, images), 0
@@ -89,10 +157,13 @@ class Candle(BaseModel):
             return structure.generate_image([h, body_top], None, None, [body_down, l])
         return structure.generate_image([h], body_top, body_down, [l])
 
-    def draw_datetime(self, with_box: tuple[int | None, int | None] | None = None):
+    @profiled()
+    def draw_datetime(self, with_box: tuple[int | None, int | None] | None = None, style: CandleStyle | None = None):
         """
         绘制K线柱的时间
 
         :param with_box: 是否需要边框 (以及边框的配置)
+        :param style: 素材与配色 (默认为配置文件的，时间的颜色随其涨跌色)
         """
-        return NumberGraphicsResources.create_datetime(self.timestamp, self.color, with_box=with_box)
+        color = self.color if style is None else self.color_for(style.green_up)
+        return NumberGraphicsResources.create_datetime(self.timestamp, color, with_box=with_box)
@@ -1,39 +1,63 @@
 from ._candle import Candle
-from ._resources import CandleGraphicsResources
+from ._resources import CandleGraphicsResources, CandleStyle
 from asset.number import NumberGraphicsResources
 from PIL import Image
+from asset.profiler import instrument, profiled
+from concurrent.futures import Executor
 
 
+@instrument
 class Coordination:
     @classmethod
-    def vertical(cls, y_max: int, y_min: int) -> Image.Image:
+    @profiled()
+    def vertical(cls, y_max: int, y_min: int, step: int = 1, color: str | tuple[int, int, int] | None = None) -> Image.Image:
         """
         生成垂直坐标系的数据图像 (分数)
+
+        :param step: 每像素行对应的分数 (y_max/y_min为量化后的格数，刻度间隔随之放大为 vertical-spacing * step 分)
+        :param color: 文字颜色 (默认为 NumberGraphicsResources.color)
         """
+        color = color or NumberGraphicsResources.color
         y_max = CandleGraphicsResources.vertical_floor(y_max)
         y_min = CandleGraphicsResources.vertical_round(y_min)
         section = CandleGraphicsResources.scale * CandleGraphicsResources.vertical
-        spacing = section - NumberGraphicsResources.number_height - int(NumberGraphicsResources.upper)
+        number_height, upper = NumberGraphicsResources.probe()
+        spacing = section - number_height - int(upper)
         images: list[Image.Image] = []
         for y in range(y_max, y_min - 1, -CandleGraphicsResources.vertical):
             images.append(NumberGraphicsResources.create_number(
-                y,
-                NumberGraphicsResources.color,
-                upper=NumberGraphicsResources.upper,
+                y * step,
+                color,
+                upper=upper,
             ))
             images.append(Image.new("RGBA", (CandleGraphicsResources.spacing * CandleGraphicsResources.scale, spacing)))
         images.pop()
         return CandleGraphicsResources.vertical_combine_images(*images)
 
     @classmethod
-    def horizontal(cls, candles: list[Candle]) -> Image.Image:
+    @profiled()
+    def horizontal(
+        cls,
+        candles: list[Candle],
+        base: Image.Image | None = None,
+        executor: Executor | None = None,
+        style: CandleStyle | None = None
+    ) -> Image.Image:
         """
         生成水平坐标系的数据图像 (日期/时间)
+
+        :param base: 已有的水平坐标图像 (给定时只绘制新增K线的日期并拼接在其右侧)
+        :param executor: 并行绘制日期的执行器 (保持顺序)
+        :param style: 素材与配色 (默认为配置文件的)
         """
-        x_images = [candle.draw_datetime((
-            (CandleGraphicsResources.width + CandleGraphicsResources.spacing) * CandleGraphicsResources.scale,
-            None
-        )) for candle in candles]
+        width = CandleGraphicsResources.width if style is None else style.width
+        box = ((width + CandleGraphicsResources.spacing) * CandleGraphicsResources.scale, None)
+        if executor is None:
+            x_images = [candle.draw_datetime(box, style) for candle in candles]
+        else:
+            x_images = list(executor.map(lambda candle: candle.draw_datetime(box, style), candles))
+        if base is not None:
+            x_images.insert(0, base)
         image = Image.new("RGBA", (sum(x.width for x in x_images), max(x.height for x in x_images)))
         x = 0
         for x_image in x_images:
@@ -1,27 +1,47 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import IO, Callable, Iterable, Mapping, TypeVar, overload
 import datetime
-from typing import overload
 from ._candle import Candle
-from ._enum import CandleErrorStatus
-from ._resources import CandleGraphicsResources
+from ._resources import CandleGraphicsResources, CandleStyle
 from ._structure import CandleStructure
 from ._coordination import Coordination
+from ._series import CandleSeries
+from ._layout import Box, Layout, Placement, intersect, translate, union
+from ._pyramid import CandlePyramid
+from . import _backend
 from asset.number import NumberGraphicsResources
+from asset.cache import RenderCache
+from asset.encoding import EncodeOptions, encode_all
+from asset.profiler import instrument, profiled
 from PIL import Image
-import csv
 
 
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@instrument
 class CandleGroup:
+    # merged_tuple 中各图像的名称 (按顺序)
+    ARTIFACTS = ('candlestick', 'number', 'merged', 'coord', 'horizontal')
+
     @overload
-    def __init__(self, *, candles: list[Candle]) -> None:
+    def __init__(self, *, candles: list[Candle], logical: bool | None = None, executor: Executor | None = None, jobs: int | None = None, cache: RenderCache | None = None, step: int = 1, style: CandleStyle | None = None) -> None:
         """
         使用给定K线数据创建K线组
 
         :param candles: K线数据列表
+        :param logical: 是否以逻辑像素渲染K线层 (默认为 assets.candlestick.logical)
+        :param executor: 并行渲染子图像的执行器 (保持顺序)
+        :param jobs: 未给定executor时，创建该线程数的线程池
+        :param cache: 磁盘渲染缓存 (复用单根K线的数值图像)
+        :param step: 每像素行对应的分数 (K线几何与坐标按该步长量化，见bounded)
+        :param style: 素材与配色 (默认为配置文件的，见CandleStyle)
         """
         ...
 
     @overload
-    def __init__(self, *, csv_file: str) -> None:
+    def __init__(self, *, csv_file: str | IO[str], timezone: datetime.tzinfo | None = None, logical: bool | None = None, executor: Executor | None = None, jobs: int | None = None, cache: RenderCache | None = None, step: int = 1, style: CandleStyle | None = None) -> None:
         """
         使用给定CSV文件创建K线组
 
@@ -31,51 +51,354 @@ class CandleGroup:
 
         2. 必须包含上述的标题行
 
-        :param csv_file: CSV文件路径
+        3. timestamp支持秒/毫秒时间戳、ISO 8601日期或日期时间、`Y/m/d`、`Y.m.d` (依据前几行自动检测)
+
+        :param csv_file: CSV文件路径或文本流
+        :param timezone: 无时区时间的时区 (默认为本地时间)
+        :param logical: 是否以逻辑像素渲染K线层 (默认为 assets.candlestick.logical)
+        :param executor: 并行渲染子图像的执行器 (保持顺序)
+        :param jobs: 未给定executor时，创建该线程数的线程池
+        :param cache: 磁盘渲染缓存 (复用单根K线的数值图像)
+        :param step: 每像素行对应的分数 (K线几何与坐标按该步长量化，见bounded)
+        :param style: 素材与配色 (默认为配置文件的，见CandleStyle)
+        """
+        ...
+
+    @overload
+    def __init__(self, *, series: CandleSeries, logical: bool | None = None, executor: Executor | None = None, jobs: int | None = None, cache: RenderCache | None = None, step: int = 1, style: CandleStyle | None = None) -> None:
+        """
+        使用给定列式K线序列创建K线组
+
+        :param series: 列式K线序列
+        :param logical: 是否以逻辑像素渲染K线层 (默认为 assets.candlestick.logical)
+        :param executor: 并行渲染子图像的执行器 (保持顺序)
+        :param jobs: 未给定executor时，创建该线程数的线程池
+        :param cache: 磁盘渲染缓存 (复用单根K线的数值图像)
+        :param step: 每像素行对应的分数 (K线几何与坐标按该步长量化，见bounded)
+        :param style: 素材与配色 (默认为配置文件的，见CandleStyle)
         """
         ...
 
     def __init__(
         self, *,
         candles: list[Candle] | None = None,
-        csv_file: str | None = None
+        csv_file: str | IO[str] | None = None,
+        series: CandleSeries | None = None,
+        timezone: datetime.tzinfo | None = None,
+        logical: bool | None = None,
+        executor: Executor | None = None,
+        jobs: int | None = None,
+        cache: RenderCache | None = None,
+        step: int = 1,
+        style: CandleStyle | None = None
     ) -> None:
+        if step < 1:
+            raise ValueError(f"Invalid step: {step}")
+        self._step = step
+        self._style = style
+        self._logical = CandleGraphicsResources.logical if logical is None else logical
+        if executor is None and jobs is not None and jobs > 1:
+            executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="candle")
+        self._executor = executor
+        self._cache = cache
         if candles is not None:
             self._candles = sorted(candles, key=lambda x: x.timestamp)
+            self._series = CandleSeries.from_candles(self._candles)
+        elif series is not None:
+            self._series = series
         elif csv_file is not None:
-            with open(csv_file, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                _ = next(reader) # skip header
-                self._candles = []
-                for row in reader:
-                    try:
-                        t, *ohlc = row
-                        o, h, l, c = map(int, ohlc)
-                        if not t.isdigit():
-                            t = t.replace("T", " ").replace("Z", "").replace("/", "-").replace(".", "-")
-                            if ' ' in t:
-                                t = datetime.datetime.strptime(t, "%Y-%m-%d %H:%M:%S").timestamp()
-                            else:
-                                t = datetime.datetime.strptime(t, "%Y-%m-%d").timestamp()
-                        t = int(t)
-                    except Exception as e:
-                        if len(row) != 5: continue
-                        raise ValueError(f"Invalid row: {row}") from e
-                    self._candles.append(Candle(timestamp=t, open=o, high=h, low=l, close=c))
-                self._candles.sort(key=lambda x: x.timestamp)
+            self._series = CandleSeries.from_csv(csv_file, tz=timezone)
         else:
-            raise ValueError("Missing required arguments: candles or csv_file")
+            raise ValueError("Missing required arguments: candles, series or csv_file")
 
     def __len__(self) -> int:
-        return len(self._candles)
+        return len(self._series)
 
     def __getitem__(self, index: int) -> Candle:
-        return self._candles[index].model_copy()
+        return self.candles[index].model_copy()
+
+    @property
+    def series(self) -> CandleSeries:
+        """
+        列式K线序列
+        """
+        return self._series
+
+    @property
+    def step(self) -> int:
+        """
+        每像素行对应的分数
+        """
+        return self._step
+
+    @property
+    def style(self) -> CandleStyle:
+        """
+        素材与配色 (未指定时为配置文件的)
+        """
+        return self._style or CandleGraphicsResources.style()
+
+    @property
+    def geometry(self) -> CandleSeries:
+        """
+        绘制K线与计算坐标所用的序列 (分数按step量化，step为1时即为series)
+        """
+        if getattr(self, "_geometry", None) is None:
+            self._geometry = self._series.quantize(self._step)
+        return self._geometry
+
+    @property
+    def candles(self) -> list[Candle]:
+        """
+        K线数据列表 (按需由列式序列构建)
+        """
+        if getattr(self, "_candles", None) is None:
+            self._candles = self._series.candles()
+        return self._candles
 
+    @profiled()
     def check_error(self):
-        errors = [candle for candle in self._candles if candle.check != CandleErrorStatus.NORMAL]
+        errors = self._series.errors()
         if errors:
-            raise ValueError(f"{CandleGraphicsResources.i18n['invalid-candles']}\n{'\n'.join(error.error_message for error in errors)}")
+            raise ValueError(f"{CandleGraphicsResources.i18n['invalid-candles']}\n{'\n'.join(
+                f'{timestamp}: {CandleGraphicsResources.i18n.get(status.name, 'UNKNOWN')}' for timestamp, status in errors
+            )}")
+
+    def window(
+        self,
+        start: int | None = None,
+        stop: int | None = None,
+        *,
+        timestamp: bool = False,
+        keep_range: bool = False
+    ) -> 'CandleGroup':
+        """
+        截取一段K线作为新的K线组，只渲染视窗内的K线、数值与坐标
+
+        已渲染的子图像(K线与数值)会直接复用，进程级的精灵图缓存对所有视窗共享
+
+        :param start: 起始索引 (timestamp为真时为起始时间，含)
+        :param stop: 结束索引 (timestamp为真时为结束时间，不含)
+        :param timestamp: 是否按时间截取
+        :param keep_range: 是否保持整体的分数范围 (否则按视窗内的最高/最低分)
+        """
+        if timestamp:
+            start = None if start is None else self._series.bisect(start)
+            stop = None if stop is None else self._series.bisect(stop)
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if stop <= start:
+            raise ValueError("Empty window")
+        group = CandleGroup(series=self._series[start:stop], logical=self._logical, executor=self._executor, cache=self._cache, step=self._step, style=self._style)
+        if keep_range:
+            group._y_max, group._y_min = self.y_max, self.y_min
+        if getattr(self, "_candles", None) is not None:
+            group._candles = self._candles[start:stop]
+        if getattr(self, "_images", None) is not None:
+            group._images = self._images[start:stop]
+            group._structures = self._structures[start:stop]
+        if getattr(self, "_number_images", None) is not None:
+            group._number_images = self._number_images[start:stop]
+        return group
+
+    @property
+    def pyramid(self) -> CandlePyramid:
+        """
+        多分辨率K线金字塔 (首次使用时以O(N)构建，追加K线后重建)
+        """
+        if getattr(self, "_pyramid", None) is None:
+            self._pyramid = CandlePyramid(self._series)
+        return self._pyramid
+
+    def overview(
+        self,
+        width: int,
+        start: int | None = None,
+        stop: int | None = None,
+        *,
+        timestamp: bool = False,
+        keep_range: bool = False
+    ) -> 'CandleGroup':
+        """
+        总览: 选取能以不超过width像素绘制区间内K线的最精细层级，返回该层级的K线组 (用同样的精灵图绘制)
+
+        金字塔随K线组保存，不同缩放/区间的总览只与输出的K线数有关；
+        合并的层级按索引对齐，区间两端向外扩展到整根合并K线；不需要合并时等同于window
+
+        :param width: 目标宽度 (像素)
+        :param start: 起始索引 (timestamp为真时为起始时间，含)
+        :param stop: 结束索引 (timestamp为真时为结束时间，不含)
+        :param timestamp: 是否按时间截取
+        :param keep_range: 是否保持整体的分数范围
+        """
+        if timestamp:
+            start = None if start is None else self._series.bisect(start)
+            stop = None if stop is None else self._series.bisect(stop)
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if stop <= start:
+            raise ValueError("Empty window")
+        if stop - start <= CandlePyramid.capacity(width, self.candle_width):
+            return self.window(start, stop, keep_range=keep_range)
+        _, series = self.pyramid.fit(width, start, stop, self.candle_width)
+        group = CandleGroup(series=series, logical=self._logical, executor=self._executor, cache=self._cache, step=self._step, style=self._style)
+        if keep_range:
+            group._y_max, group._y_min = self.y_max, self.y_min
+        return group
+
+    @staticmethod
+    def fit_step(y_max: int, y_min: int, max_height: int) -> int:
+        """
+        使K线层高度不超过max_height(像素)的最小步长 (取1、2、5乘以10的幂，使坐标刻度仍为整齐的分数)
+
+        :param y_max: 最高分
+        :param y_min: 最低分
+        :param max_height: 最大高度 (像素)
+        """
+        scale = CandleGraphicsResources.scale
+        if max_height < scale:
+            raise ValueError(f"Invalid max height: {max_height}")
+        magnitude = 1
+        while True:
+            for factor in (1, 2, 5):
+                step = factor * magnitude
+                if (y_max // step - y_min // step + 1) * scale <= max_height:
+                    return step
+            magnitude *= 10
+
+    def bounded(self, max_width: int | None = None, max_height: int | None = None) -> 'CandleGroup':
+        """
+        限制输出尺寸: 宽度超出时取总览(见overview)，高度超出时按fit_step量化分数，
+        使渲染的内存与耗时只与输出尺寸有关，而与K线数和分数范围无关；无需限制时返回自身
+
+        :param max_width: 最大宽度 (像素)
+        :param max_height: 大图像(K线层及上下的数值留白)的最大高度 (像素)
+        """
+        group = self if max_width is None else self.overview(max_width)
+        if max_height is None:
+            return group
+        padding = 4 * NumberGraphicsResources.max_height
+        step = self.fit_step(group.series.y_max, group.series.y_min, max_height - padding)
+        if step == group._step:
+            return group
+        return CandleGroup(series=group.series, logical=self._logical, executor=self._executor, cache=self._cache, step=step, style=self._style)
+
+    def append(self, candle: Candle) -> None:
+        """
+        追加一根K线 (见extend)
+        """
+        self.extend([candle])
+
+    @profiled()
+    def extend(self, candles: Iterable[Candle]) -> None:
+        """
+        追加K线，只渲染新增的K线、数值与日期
+
+        分数范围不变时，已生成的图像在加宽的画布上粘贴新增部分；
+        范围变化时，只丢弃图像层，之后按已渲染的子图像重新摆放，不重新渲染；
+        早于最后一根K线的数据，或量化绘制(step不为1)时会导致整体重建
+        """
+        candles = sorted(candles, key=lambda x: x.timestamp)
+        if not candles:
+            return
+        if len(self) == 0 or self._step != 1 or candles[0].timestamp < int(self._series.timestamp[-1]):
+            logical, executor, cache, step, style = self._logical, self._executor, self._cache, self._step, self._style
+            merged = self.candles + candles
+            self.__dict__.clear()
+            self.__init__(candles=merged, logical=logical, executor=executor, cache=cache, step=step, style=style)
+            return
+        start, old_width = len(self), self.width
+        old_range = getattr(self, "_y_max", None), getattr(self, "_y_min", None)
+        self._series.extend((c.timestamp, c.open, c.high, c.low, c.close) for c in candles)
+        if getattr(self, "_candles", None) is not None:
+            self._candles.extend(candles)
+        if old_range[0] is not None:
+            self._y_max = max(old_range[0], max(candle.high for candle in candles))
+        if old_range[1] is not None:
+            self._y_min = min(old_range[1], min(candle.low for candle in candles))
+        changed = (getattr(self, "_y_max", None), getattr(self, "_y_min", None)) != old_range
+        if getattr(self, "_y_indexes", None) is not None:
+            if changed:
+                self._y_indexes = None
+            else:
+                self._y_indexes.extend((self._y_max - candle.high) * CandleGraphicsResources.scale for candle in candles)
+        if getattr(self, "_images", None) is not None:
+            for image, structure in self._map(self._draw_candle, candles):
+                self._images.append(image)
+                self._structures.append(structure)
+        if getattr(self, "_number_images", None) is not None:
+            self._number_images.extend(self._map(self._draw_number, zip(candles, self._structures[start:])))
+            if getattr(self, "_number_reach", None) is not None:
+                self._number_reach = max(self._number_reach, *(image.width for image, _ in self._number_images[start:]))
+        if getattr(self, "_horizontal", None) is not None:
+            self._horizontal = Coordination.horizontal(candles, base=self._horizontal, executor=self._executor, style=self._style)
+        layers = ("_logical_image", "_image", "_big_image", "_number_image", "_merged_image")
+        self._number_layer = None
+        self._pyramid = None
+        if changed:
+            for name in (*layers, "_coordinate"):
+                setattr(self, name, None)
+        elif any(getattr(self, name, None) is not None for name in layers):
+            self._grow_layers(start, old_width)
+
+    def _grow_layers(self, start: int, old_width: int):
+        """
+        在加宽的画布上粘贴从start开始新增的子图像 (分数范围不变时)
+        """
+        def grow(image: Image.Image, width: int | None = None) -> Image.Image:
+            grown = Image.new("RGBA", (width or self.width, image.height))
+            grown.paste(image, (0, 0))
+            return grown
+
+        def x_of(index: int) -> int:
+            return index * (self.candle_width + self.spacing)
+
+        scale = CandleGraphicsResources.scale
+        offset = 2 * NumberGraphicsResources.max_height
+        y_indexes = self.y_indexes
+        new = range(start, len(self))
+        if getattr(self, "_images", None) is None:
+            # NumPy后端合成的图像层不经过子图像，新增的K线同样按数组合成
+            lengths = [column[start:].tolist() for column in (self.geometry.up_length, self.geometry.body_length, self.geometry.down_length)]
+
+            def sprite(index: int, target_scale: int) -> Image.Image:
+                return _backend.candle_image(*(column[index - start] for column in lengths), target_scale, self._style)
+        else:
+            def sprite(index: int, target_scale: int) -> Image.Image:
+                image = self._images[index]
+                if target_scale == 1 and not self._logical:
+                    return image.resize((image.width // scale, image.height // scale), Image.Resampling.NEAREST)
+                if target_scale != 1 and self._logical:
+                    return image.resize((image.width * scale, image.height * scale), Image.Resampling.NEAREST)
+                return image
+
+        if getattr(self, "_logical_image", None) is not None:
+            self._logical_image = grow(self._logical_image, self.width // scale)
+            for i in new:
+                self._logical_image.paste(sprite(i, 1), (x_of(i) // scale, y_indexes[i] // scale))
+        for name, y_offset in (("_image", 0), ("_big_image", offset)):
+            if getattr(self, name, None) is not None:
+                layer = grow(getattr(self, name))
+                for i in new:
+                    layer.paste(sprite(i, scale), (x_of(i), y_indexes[i] + y_offset))
+                setattr(self, name, layer)
+        left = x_of(start)
+        if getattr(self, "_number_image", None) is not None:
+            self._number_image = grow(self._number_image)
+            # 之前的数值图像可能超出原画布右侧，需要按原顺序补贴
+            repaste: list[int] = []
+            for i in range(start - 1, -1, -1):
+                if x_of(i) + self.number_reach <= old_width:
+                    break
+                if x_of(i) + self._number_images[i][0].width > old_width:
+                    repaste.insert(0, i)
+            for i in [*repaste, *new]:
+                image, y_offset = self._number_images[i]
+                self._number_image.paste(image, (x_of(i), y_indexes[i] + offset - y_offset))
+            if repaste:
+                left = x_of(repaste[0])
+        if getattr(self, "_merged_image", None) is not None:
+            self._merged_image = grow(self._merged_image)
+            box = (left, 0, self.width, self._merged_image.height)
+            self._merged_image.paste(Image.alpha_composite(self.big_image.crop(box), self.number_image.crop(box)), box)
 
     @property
     def spacing(self) -> int:
@@ -91,26 +414,34 @@ class CandleGroup:
         """
         每K线图像宽度
         """
-        return CandleGraphicsResources.width * CandleGraphicsResources.scale
+        width = CandleGraphicsResources.width if self._style is None else self._style.width
+        return width * CandleGraphicsResources.scale
 
     @property
     def y_max(self) -> int:
         """
-        最高分
+        最高分 (step不为1时为量化后的格数)
         """
         if getattr(self, "_y_max", None) is None:
-            self._y_max = max(candle.high for candle in self._candles)
+            self._y_max = self.geometry.y_max
         return self._y_max
 
     @property
     def y_min(self) -> int:
         """
-        最低分
+        最低分 (step不为1时为量化后的格数)
         """
         if getattr(self, "_y_min", None) is None:
-            self._y_min = min(candle.low for candle in self._candles)
+            self._y_min = self.geometry.y_min
         return self._y_min
 
+    @property
+    def render_scale(self) -> int:
+        """
+        K线层实际渲染时的像分比例 (逻辑像素渲染时为1，最后统一放大)
+        """
+        return 1 if self._logical else CandleGraphicsResources.scale
+
     @property
     def x_indexes(self):
         """
@@ -124,7 +455,7 @@ class CandleGroup:
         Y轴索引列表
         """
         if getattr(self, "_y_indexes", None) is None:
-            self._y_indexes = [(self.y_max - candle.high) * CandleGraphicsResources.scale for candle in self._candles]
+            self._y_indexes = self.geometry.y_indexes(self.y_max, CandleGraphicsResources.scale)
         return self._y_indexes
 
     @property
@@ -141,22 +472,57 @@ class CandleGroup:
         """
         return (self.y_max - self.y_min + 1) * CandleGraphicsResources.scale
 
+    def _map(self, func: Callable[[T], R], items: Iterable[T]) -> list[R]:
+        """
+        按顺序映射 (给定执行器时并行)
+        """
+        if self._executor is None:
+            return [func(item) for item in items]
+        return list(self._executor.map(func, items))
+
+    def _draw_candle(self, candle: Candle) -> tuple[Image.Image, CandleStructure]:
+        image, structure = candle.draw_candle(self.render_scale, self._style)
+        return image, structure.rescale(CandleGraphicsResources.scale)
+
+    def _draw_number(self, item: tuple[Candle, CandleStructure]) -> tuple[Image.Image, int]:
+        candle, structure = item
+        if self._cache is None:
+            return candle.draw_number(structure, self._style)
+        # 数值图像只由开高低收决定 (绘制参数同样由其导出)，量化绘制时还取决于step；
+        # 指定素材与配色时还取决于涨跌色与K线宽度 (配置文件的由缓存的指纹区分)
+        key = (candle.open, candle.high, candle.low, candle.close)
+        if self._step != 1:
+            key = (*key, self._step)
+        if self._style is not None:
+            key = (*key, 'style', self._style.green_up, self._style.width)
+        return self._cache.sprite(key, lambda: candle.draw_number(structure, self._style))
+
+    @profiled()
     def _gen_klines(self):
         if getattr(self, "_images", None) is None:
-            self._images = []
-            self._structures = []
-            for candle in self._candles:
-                image, structure = candle.draw_candle()
-                self._images.append(image)
-                self._structures.append(structure)
+            # 量化绘制时K线按量化后的几何绘制，数值仍显示原始分数
+            rendered = self._map(self._draw_candle, self.candles if self._step == 1 else self.geometry.candles())
+            self._images = [image for image, _ in rendered]
+            self._structures = [structure for _, structure in rendered]
 
     @property
+    @profiled()
     def images(self) -> list[Image.Image]:
         """
         子图像列表 (每个K线的图像)
         """
         self._gen_klines()
-        return self._images
+        if not self._logical:
+            return self._images
+        # 逻辑像素下放大后的子图像只生成一次 (追加K线后只放大新增的部分)
+        if getattr(self, "_scaled_images", None) is None:
+            self._scaled_images: list[Image.Image] = []
+        scale = CandleGraphicsResources.scale
+        self._scaled_images.extend(
+            image.resize((image.width * scale, image.height * scale), Image.Resampling.NEAREST)
+            for image in self._images[len(self._scaled_images):]
+        )
+        return self._scaled_images
 
     @property
     def structures(self) -> list[CandleStructure]:
@@ -167,17 +533,58 @@ class CandleGroup:
         return self._structures
 
     @property
+    @profiled()
+    def logical_image(self) -> Image.Image:
+        """
+        逻辑像素下的结果图像 (每个像素对应一分)
+        """
+        if getattr(self, "_logical_image", None) is None:
+            scale = CandleGraphicsResources.scale
+            if self._logical and _backend.use_numpy():
+                self._logical_image = _backend.compose(
+                    self.geometry, (self.candle_width + self.spacing) // scale,
+                    [y // scale for y in self.y_indexes], (self.width // scale, self.height // scale), 1, self._style
+                )
+                return self._logical_image
+            self._gen_klines()
+            self._logical_image = Image.new("RGBA", (self.width // scale, self.height // scale))
+            if self._logical:
+                for x_now, y_now, image in zip(self.x_indexes, self.y_indexes, self._images):
+                    self._logical_image.paste(image, (x_now // scale, y_now // scale))
+            else:
+                self._logical_image = self.image.resize(self._logical_image.size, Image.Resampling.NEAREST)
+        return self._logical_image
+
+    def scaled_image(self, scale: int) -> Image.Image:
+        """
+        将逻辑像素的结果图像以最近邻放大到任意整数倍 (一次渲染，多种尺寸输出)
+        """
+        if scale == 1:
+            return self.logical_image
+        if _backend.use_numpy():
+            return _backend.upscale(self.logical_image, scale)
+        return self.logical_image.resize((self.logical_image.width * scale, self.logical_image.height * scale), Image.Resampling.NEAREST)
+
+    @property
+    @profiled()
     def image(self) -> Image.Image:
         """
         结果图像
         """
         if getattr(self, "_image", None) is None:
-            self._image = Image.new("RGBA", (self.width, self.height))
-            for x_now, y_now, image in zip(self.x_indexes, self.y_indexes, self.images):
-                self._image.paste(image, (x_now, y_now))
+            if self._logical:
+                self._image = self.scaled_image(CandleGraphicsResources.scale)
+            elif _backend.use_numpy():
+                self._image = _backend.compose(self.geometry, self.candle_width + self.spacing, self.y_indexes, (self.width, self.height), CandleGraphicsResources.scale, self._style)
+            else:
+                self._gen_klines()
+                self._image = Image.new("RGBA", (self.width, self.height))
+                for x_now, y_now, image in zip(self.x_indexes, self.y_indexes, self._images):
+                    self._image.paste(image, (x_now, y_now))
         return self._image
 
     @property
+    @profiled()
     def big_image(self) -> Image.Image:
         """
         大图像
@@ -188,17 +595,26 @@ class CandleGroup:
         return self._big_image
 
     @property
+    @profiled()
     def number_images(self):
         """
         数值图像列表 (每个K线的数值图像)
         """
         if getattr(self, "_number_images", None) is None:
-            self._number_images: list[tuple[Image.Image, int]] = []
-            for candle, structure in zip(self._candles, self.structures):
-                self._number_images.append(candle.draw_number(structure))
+            self._number_images: list[tuple[Image.Image, int]] = self._map(self._draw_number, zip(self.candles, self.structures))
         return self._number_images
 
     @property
+    def number_reach(self) -> int:
+        """
+        数值图像的最大宽度 (可能超出K线宽度)
+        """
+        if getattr(self, "_number_reach", None) is None:
+            self._number_reach = max(image.width for image, _ in self.number_images)
+        return self._number_reach
+
+    @property
+    @profiled()
     def number_image(self) -> Image.Image:
         """
         数值结果图像
@@ -210,24 +626,27 @@ class CandleGroup:
         return self._number_image
 
     @property
+    @profiled()
     def coordinate(self) -> Image.Image:
         """
         坐标轴图像
         """
         if getattr(self, "_coordinate", None) is None:
-            self._coordinate = Coordination.vertical(self.y_max, self.y_min)
+            self._coordinate = Coordination.vertical(self.y_max, self.y_min, self._step, None if self._style is None else self._style.font_color)
         return self._coordinate
 
     @property
+    @profiled()
     def horizontal(self) -> Image.Image:
         """
         水平坐标图像
         """
         if getattr(self, "_horizontal", None) is None:
-            self._horizontal = Coordination.horizontal(self._candles)
+            self._horizontal = Coordination.horizontal(self.candles, executor=self._executor, style=self._style)
         return self._horizontal
 
     @property
+    @profiled()
     def merged_image(self) -> Image.Image:
         """
         合并结果图像
@@ -236,15 +655,131 @@ class CandleGroup:
             self._merged_image = Image.alpha_composite(self.big_image, self.number_image)
         return self._merged_image
 
+    def candle_layout(self) -> Layout:
+        """
+        K线层的解析布局 (结果图像坐标)
+        """
+        self._gen_klines()
+        factor = CandleGraphicsResources.scale if self._logical else 1
+        return Layout(
+            (Placement(image, x_now, y_now, factor) for x_now, y_now, image in zip(self.x_indexes, self.y_indexes, self._images)),
+            (0, 0, self.width, self.height)
+        )
+
+    def number_layout(self) -> Layout:
+        """
+        数值层的解析布局 (大图像坐标)
+        """
+        offset = 2 * NumberGraphicsResources.max_height
+        return Layout(
+            (Placement(image, x_now, y_now + offset - y_offset) for x_now, y_now, (image, y_offset) in zip(self.x_indexes, self.y_indexes, self.number_images)),
+            (0, 0, self.width, self.height + 2 * offset)
+        )
+
+    @property
+    @profiled()
+    def number_layer(self) -> tuple[Box, Image.Image] | None:
+        """
+        按解析布局直接生成的裁剪后数值图像，及其在大图像中的范围 (与 number_image.crop(number_image.getbbox()) 一致)
+
+        数值图像的矩形互相重叠时为None (此时需要整幅画布)
+        """
+        if getattr(self, "_number_layer", None) is None:
+            layout = self.number_layout()
+            if not layout.disjoint or layout.bbox is None:
+                return None
+            self._number_layer = (layout.bbox, layout.render(layout.bbox))
+        return self._number_layer
+
+    @profiled()
+    def _layout_merged(self) -> Image.Image | None:
+        """
+        按解析布局直接生成裁剪后的合并图像 (与 merged_image.crop(merged_image.getbbox()) 一致)
+
+        只在合并范围的画布上粘贴一次K线层，再逐个在数值图像的矩形内做alpha合成 (矩形之外数值层全透明，合成结果即为K线层)
+        """
+        candles = self.candle_layout()
+        numbers = self.number_layout()
+        if not candles.disjoint or not numbers.disjoint or numbers.bbox is None:
+            return None
+        offset = 2 * NumberGraphicsResources.max_height
+        box = union(translate(candles.bbox, 0, offset), numbers.bbox)
+        merged = Image.new("RGBA", (box[2] - box[0], box[3] - box[1]))
+        merged.paste(self.image, (-box[0], offset - box[1]))
+        for placement in numbers.placements:
+            visible = intersect(placement.rect, box)
+            if visible is None:
+                continue
+            source = translate(visible, -placement.x, -placement.y)
+            merged.alpha_composite(placement.image, (visible[0] - box[0], visible[1] - box[1]), source)
+        return merged
+
     @property
     def merged_tuple(self) -> tuple[Image.Image, ...]:
         """
         合并结果图像元组
         """
-        return (
-            self.image,
-            self.number_image.crop(self.number_image.getbbox()),
-            self.merged_image.crop(self.merged_image.getbbox()),
-            self.coordinate,
-            self.horizontal,
-        )
\ No newline at end of file
+        return tuple(self.artifact(name) for name in self.ARTIFACTS)
+
+    @profiled()
+    def artifact(self, name: str) -> Image.Image:
+        """
+        按名称取合并结果图像元组中的一张 (只生成该图像所需的图像层)
+
+        :param name: ARTIFACTS之一
+        """
+        match name:
+            case 'candlestick':
+                return self.image
+            case 'number':
+                if getattr(self, "_number_image", None) is None and self.number_layer is not None:
+                    return self.number_layer[1]
+                return self.number_image.crop(self.number_image.getbbox())
+            case 'merged':
+                if getattr(self, "_merged_image", None) is None:
+                    merged = self._layout_merged()
+                    if merged is not None:
+                        return merged
+                return self.merged_image.crop(self.merged_image.getbbox())
+            case 'coord':
+                return self.coordinate
+            case 'horizontal':
+                return self.horizontal
+            case _:
+                raise ValueError(f"Invalid artifact {name}")
+
+    @profiled()
+    def export(
+        self,
+        formats: Mapping[str, str | EncodeOptions] | str | EncodeOptions | None = None,
+        to: Mapping[str, str | IO[bytes]] | str | IO[bytes] | None = None
+    ) -> dict[str, bytes]:
+        """
+        并发编码结果图像，返回编码后的字节 (可直接上传，无需临时文件)
+
+        :param formats: 图像名称 -> 编码参数(预设名称或EncodeOptions)，只导出给定的图像；
+                        为单个编码参数时应用于所有图像 (默认为全部图像的PNG默认编码)
+        :param to: 图像名称 -> 文件路径或二进制流；只导出一张图像时也可直接给定路径或流
+        :return: 图像名称 -> 编码后的字节
+        """
+        if isinstance(formats, Mapping):
+            names = tuple(formats)
+        elif isinstance(to, Mapping):
+            names = tuple(to)
+        else:
+            names = self.ARTIFACTS
+        if to is not None and not isinstance(to, Mapping):
+            if len(names) != 1:
+                raise ValueError("A single target requires exactly one artifact")
+            to = {names[0]: to}
+        if to is not None and not set(to) <= set(names):
+            raise ValueError(f"Targets without formats: {', '.join(set(to) - set(names))}")
+        images = {name: self.artifact(name) for name in names}
+        encoded = encode_all(images, formats, self._executor)
+        for name, target in (to or {}).items():
+            if isinstance(target, str):
+                with open(target, 'wb') as f:
+                    f.write(encoded[name])
+            else:
+                target.write(encoded[name])
+        return encoded
\ No newline at end of file
@@ -0,0 +1,135 @@
+from typing import Iterable, NamedTuple
+from PIL import Image
+
+
+# (left, top, right, bottom)，与Image.getbbox一致
+Box = tuple[int, int, int, int]
+
+
+def union(*boxes: Box | None) -> Box | None:
+    """
+    多个矩形的外接矩形 (忽略None)
+    """
+    boxes = [box for box in boxes if box is not None]
+    if not boxes:
+        return None
+    return (
+        min(box[0] for box in boxes),
+        min(box[1] for box in boxes),
+        max(box[2] for box in boxes),
+        max(box[3] for box in boxes),
+    )
+
+
+def intersect(a: Box, b: Box) -> Box | None:
+    """
+    两个矩形的交集 (不相交时为None)
+    """
+    box = (max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3]))
+    if box[0] >= box[2] or box[1] >= box[3]:
+        return None
+    return box
+
+
+def translate(box: Box | None, x: int, y: int) -> Box | None:
+    if box is None:
+        return None
+    return (box[0] + x, box[1] + y, box[2] + x, box[3] + y)
+
+
+class Placement(NamedTuple):
+    """
+    子图像在画布上的位置
+
+    :param factor: 子图像在画布上的放大倍数 (逻辑像素渲染的K线为像分比例，位置为其整数倍)
+    """
+    image: Image.Image
+    x: int
+    y: int
+    factor: int = 1
+
+    @property
+    def rect(self) -> Box:
+        return (self.x, self.y, self.x + self.image.width * self.factor, self.y + self.image.height * self.factor)
+
+
+class Layout:
+    """
+    一组按顺序粘贴(覆盖)到画布上的子图像的解析布局
+
+    由整数几何直接得到每个子图像的矩形与整体的内容边界 (只扫描子图像本身)，
+    之后在预先确定尺寸的画布上逐个粘贴一次，无需先粘贴到整幅画布再getbbox与裁剪
+    """
+
+    def __init__(self, placements: Iterable[Placement], clip: Box):
+        """
+        :param placements: 按粘贴顺序的子图像位置
+        :param clip: 原画布的范围 (超出部分被裁掉)
+        """
+        self.placements = list(placements)
+        self.clip = clip
+
+    @property
+    def disjoint(self) -> bool:
+        """
+        子图像的矩形互不重叠
+
+        重叠时后粘贴的子图像会以透明像素覆盖之前的内容，内容边界不能逐个合并
+        """
+        if getattr(self, "_disjoint", None) is None:
+            active: list[Box] = []
+            self._disjoint = True
+            for rect in sorted(placement.rect for placement in self.placements):
+                active = [box for box in active if box[2] > rect[0]]
+                if any(box[1] < rect[3] and rect[1] < box[3] for box in active):
+                    self._disjoint = False
+                    break
+                active.append(rect)
+        return self._disjoint
+
+    @property
+    def bbox(self) -> Box | None:
+        """
+        裁剪到原画布后的非透明内容边界 (仅在disjoint时与整幅画布的getbbox一致)
+        """
+        if getattr(self, "_bbox", None) is None:
+            # 共享的子图像(缓存的精灵图)只扫描一次
+            scanned: dict[tuple[int, Box], Box | None] = {}
+            boxes: list[Box | None] = []
+            for placement in self.placements:
+                rect = placement.rect
+                visible = intersect(rect, self.clip)
+                if visible is None:
+                    continue
+                factor = placement.factor
+                # 可见部分在子图像中的范围 (放大倍数下向外取整)
+                local = (
+                    (visible[0] - rect[0]) // factor,
+                    (visible[1] - rect[1]) // factor,
+                    -((rect[0] - visible[2]) // factor),
+                    -((rect[1] - visible[3]) // factor),
+                )
+                key = (id(placement.image), local)
+                if key not in scanned:
+                    if local == (0, 0, placement.image.width, placement.image.height):
+                        scanned[key] = placement.image.getbbox()
+                    else:
+                        scanned[key] = translate(placement.image.crop(local).getbbox(), local[0], local[1])
+                box = scanned[key]
+                if box is not None:
+                    box = (placement.x + box[0] * factor, placement.y + box[1] * factor, placement.x + box[2] * factor, placement.y + box[3] * factor)
+                    boxes.append(intersect(box, self.clip))
+            self._bbox = union(*boxes) or ()
+        return self._bbox or None
+
+    def render(self, box: Box) -> Image.Image:
+        """
+        只在box范围的画布上粘贴子图像 (放大倍数为1的子图像)
+        """
+        canvas = Image.new("RGBA", (box[2] - box[0], box[3] - box[1]))
+        for placement in self.placements:
+            canvas.paste(placement.image, (placement.x - box[0], placement.y - box[1]))
+        return canvas
+
+
+__all__ = ["Box", "Placement", "Layout", "union", "intersect", "translate"]
@@ -0,0 +1,78 @@
+from ._series import CandleSeries
+from ._resources import CandleGraphicsResources
+
+
+class CandlePyramid:
+    """
+    多分辨率K线金字塔 (用于缩小的总览图)
+
+    第0层为原始序列，第k层每根K线由原始的 factor**k 根合并而成 (按索引对齐)；
+    每层由上一层合并得到，总构建代价为 O(N)，之后按宽度选取层级与截取区间只与输出的K线数有关
+    """
+
+    def __init__(self, series: CandleSeries, factor: int = 4):
+        """
+        :param series: 原始序列
+        :param factor: 相邻层级的合并倍数
+        """
+        if factor < 2:
+            raise ValueError(f"Invalid factor: {factor}")
+        self.factor = factor
+        self.levels: list[CandleSeries] = [series]
+        while len(self.levels[-1]) > 1:
+            self.levels.append(self.levels[-1].downsample(factor))
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def span(self, level: int) -> int:
+        """
+        第level层每根K线对应的原始K线数
+        """
+        return self.factor ** level
+
+    @staticmethod
+    def capacity(width: int, candle_width: int | None = None) -> int:
+        """
+        宽度不超过width(像素)的图像最多容纳的K线数 (至少为1)
+
+        :param candle_width: 每K线图像宽度 (像素，默认按配置文件的素材)
+        """
+        candle = candle_width or CandleGraphicsResources.width * CandleGraphicsResources.scale
+        spacing = CandleGraphicsResources.spacing * CandleGraphicsResources.scale
+        return max(1, (width + spacing) // (candle + spacing))
+
+    def bounds(self, level: int, start: int, stop: int) -> tuple[int, int]:
+        """
+        原始索引区间[start, stop)在第level层覆盖的索引区间 (两端向外对齐到整根K线)
+        """
+        span = self.span(level)
+        return start // span, -(-stop // span)
+
+    def level_for(self, count: int, start: int = 0, stop: int | None = None) -> int:
+        """
+        区间内K线数不超过count的最精细层级
+        """
+        if stop is None:
+            stop = len(self.levels[0])
+        for level in range(len(self.levels)):
+            lower, upper = self.bounds(level, start, stop)
+            if upper - lower <= count:
+                return level
+        return len(self.levels) - 1
+
+    def fit(self, width: int, start: int = 0, stop: int | None = None, candle_width: int | None = None) -> tuple[int, CandleSeries]:
+        """
+        选取能以不超过width像素绘制原始区间[start, stop)的最精细层级
+
+        :param candle_width: 每K线图像宽度 (像素，默认按配置文件的素材)
+        :return: 层级, 该层级在区间内的序列
+        """
+        if stop is None:
+            stop = len(self.levels[0])
+        level = self.level_for(self.capacity(width, candle_width), start, stop)
+        lower, upper = self.bounds(level, start, stop)
+        return level, self.levels[level][lower:upper]
+
+
+__all__ = ["CandlePyramid"]
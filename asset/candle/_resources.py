@@ -2,10 +2,38 @@ from PIL import Image, ImageDraw
 from asset.items import ItemGraphicsFactory
 from ._structure import CandleStructure
 from asset.utils import get_i18n
-from graphics import CommonGraphics, Direction
+from graphics import CommonGraphics, Direction, LRUCache
+from asset.profiler import Profiler, instrument, profiled
+from typing import NamedTuple
 
 
+class CandleStyle(NamedTuple):
+    """
+    K线的素材与配色 (不可变值对象，显式传入各绘制函数，不修改进程级的配置)
+
+    :param arrow: 影线的素材
+    :param green: 绿色实体的素材
+    :param red: 红色实体的素材
+    :param green_up: 是否为绿涨红跌 (国际标准)
+    :param font_color: 坐标轴文字的颜色 (为None时使用 NumberGraphicsResources.color)
+    """
+    arrow: CommonGraphics
+    green: CommonGraphics
+    red: CommonGraphics
+    green_up: bool
+    font_color: str | tuple[int, int, int] | None = None
+
+    @property
+    def width(self) -> int:
+        """
+        K线的宽度 (素材的最大宽度)
+        """
+        return max(self.green.width.maximun, self.red.width.maximun, self.arrow.width.maximun)
+
+
+@instrument
 class CandleGraphicsResources:
+    factory: ItemGraphicsFactory
     arrow: CommonGraphics
     green: CommonGraphics
     red: CommonGraphics
@@ -17,7 +45,13 @@ class CandleGraphicsResources:
     spacing: int
     vertical: int
     green_up: bool
+    logical: bool
+    backend: str
     i18n: dict[str, str]
+    # K线层的绘制后端 (assets.candlestick.backend)
+    BACKENDS = ('pillow', 'numpy')
+    # 进程级的K线缓存: (素材, 缩放, 涨跌色, 结构三元组) -> (Image, CandleStructure)
+    candle_cache = LRUCache(256)
 
     @staticmethod
     def create_solid(color: str, width: int, scale: int = 1) -> Image.Image:
@@ -28,6 +62,7 @@ class CandleGraphicsResources:
 
     @classmethod
     def static_init(cls, factory: ItemGraphicsFactory):
+        cls.factory = factory
         cls.arrow = factory[factory.properties['candlestick']['arrow']]
         cls.green = factory[factory.properties['candlestick']['green']]
         cls.red = factory[factory.properties['candlestick']['red']]
@@ -41,8 +76,28 @@ class CandleGraphicsResources:
         cls.green_solid = cls.create_solid('green', cls.width, cls.scale)
         cls.red_solid = cls.create_solid('red', cls.width, cls.scale)
         cls.black_solid = cls.create_solid('black', cls.width, cls.scale)
+        cls.logical = bool(factory.properties['candlestick'].get('logical', False))
+        cls.backend = str(factory.properties['candlestick'].get('backend', 'pillow'))
         cls.i18n = get_i18n('candle')
 
+    @classmethod
+    def style(cls) -> CandleStyle:
+        """
+        配置文件的素材与配色
+        """
+        return CandleStyle(cls.arrow, cls.green, cls.red, cls.green_up)
+
+    @classmethod
+    def solid(cls, color: str, scale: int | None = None, width: int | None = None) -> Image.Image:
+        """
+        横盘线 (按scale与宽度缓存，为空时使用全局scale与K线宽度)
+        """
+        scale = scale or cls.scale
+        width = width or cls.width
+        if scale == cls.scale and width == cls.width:
+            return getattr(cls, f'{color}_solid')
+        return cls.candle_cache.get_or_create(('solid', color, width, scale), lambda: cls.create_solid(color, width, scale))
+
     @classmethod
     def vertical_round(cls, value: int) -> int:
         return value + (cls.vertical - value % cls.vertical) % cls.vertical
@@ -52,56 +107,110 @@ class CandleGraphicsResources:
         return value - value % cls.vertical
 
     @classmethod
-    def gen_arrow(cls, length: int, up: bool = True) -> Image.Image | None:
+    def gen_arrow(cls, length: int, up: bool = True, scale: int | None = None) -> Image.Image | None:
         if length <= 0:
             return None
         return cls.arrow.gen_image(
             length,
-            scale=cls.scale,
+            scale=scale or cls.scale,
             direction=(Direction.up if up else Direction.down)
         )
 
     @classmethod
-    def gen_body(cls, length: int, should_up: int, green_up: bool = False) -> Image.Image:
+    def gen_body(cls, length: int, should_up: int, green_up: bool = False, scale: int | None = None) -> Image.Image:
         """
         生成K线的实体部分
 
         :param length: 实体长度(符号携带方向)
         :param should_up: 是否为上涨(-1: 下跌, 0: 横盘, 1: 上涨)
         :param green_up: 是否为绿涨红跌(国际标准)
+        :param scale: 像分比例 (默认为 assets.candlestick.scale)
         """
         if length == 0:
             if should_up == 0:
-                return cls.black_solid
-            return (should_up > 0) ^ green_up and cls.red_solid or cls.green_solid
+                return cls.solid('black', scale)
+            return cls.solid((should_up > 0) ^ green_up and 'red' or 'green', scale)
         length += length // abs(length) # 补偿缺的一分
         return ((length > 0) ^ green_up and cls.red or cls.green).gen_image(
             abs(length),
-            scale=cls.scale,
+            scale=scale or cls.scale,
             direction=(Direction.down if length < 0 else Direction.up)
         )
 
     @classmethod
-    def gen_candle(cls, up_length: int, body_length: int, down_length: int):
+    def gen_candle(
+        cls,
+        up_length: int,
+        body_length: int,
+        down_length: int,
+        scale: int | None = None,
+        style: CandleStyle | None = None
+    ) -> tuple[Image.Image, CandleStructure]:
+        """
+        生成单个K线的图像，以及绘制参数 (经过缓存，返回的图像为共享对象，不可修改)
+
+        :param scale: 像分比例 (默认为 assets.candlestick.scale，逻辑像素渲染时为1)
+        :param style: 素材与配色 (默认为配置文件的)
+        """
+        scale = scale or cls.scale
+        style = style or cls.style()
+        return cls.candle_cache.get_or_create(
+            (style.arrow, style.green, style.red, scale, style.green_up, up_length, body_length, down_length),
+            lambda: cls._gen_candle(up_length, body_length, down_length, scale, style)
+        )
+
+    @classmethod
+    def cache_info(cls) -> dict[str, dict[str, int]]:
+        """
+        缓存命中统计
+        """
+        return {
+            'candle': cls.candle_cache.info(),
+            'sprite': CommonGraphics.cache.info(),
+        }
+
+    @classmethod
+    def candle_parts(
+        cls,
+        up_length: int,
+        body_length: int,
+        down_length: int,
+        style: CandleStyle | None = None
+    ) -> list[tuple[CommonGraphics | str, int, Direction]]:
         """
-        生成单个K线的图像，以及绘制参数
+        K线自上而下的组成部分 (与gen_arrow/gen_body一致，供不同的绘制后端共用)
+
+        :param style: 素材与配色 (默认为配置文件的)
+        :return: (素材, 长度, 方向)，横盘线的素材为颜色名 (见solid)
         """
-        should_up = up_length - down_length
-        up_image = cls.gen_arrow(up_length, up=True)
-        down_image = cls.gen_arrow(down_length, up=False)
+        style = style or cls.style()
+        parts: list[tuple[CommonGraphics | str, int, Direction]] = []
+        if up_length > 0:
+            parts.append((style.arrow, up_length, Direction.up))
+        if body_length == 0:
+            should_up = up_length - down_length
+            parts.append(('black' if should_up == 0 else (should_up > 0) ^ style.green_up and 'red' or 'green', 0, Direction.up))
+        else:
+            length = body_length + body_length // abs(body_length) # 补偿缺的一分
+            parts.append(((length > 0) ^ style.green_up and style.red or style.green, abs(length), Direction.down if length < 0 else Direction.up))
+        if down_length > 0:
+            parts.append((style.arrow, down_length, Direction.down))
+        return parts
+
+    @classmethod
+    @profiled()
+    def _gen_candle(cls, up_length: int, body_length: int, down_length: int, scale: int, style: CandleStyle) -> tuple[Image.Image, CandleStructure]:
         # 不再需要占用别的部分的长度，整数对齐天然给了一倍空间
-        # if body_length == 0:
-        #     if up_image:
-        #         up_image = up_image.crop((0, 0, up_image.width, up_image.height - 1))
-        #     elif down_image:
-        #         down_image = down_image.crop((0, 1, down_image.width, down_image.height))
-        body_image = cls.gen_body(body_length, should_up, cls.green_up)
-        image = cls.vertical_combine_images(up_image, body_image, down_image)
+        width = style.width
+        image = cls.vertical_combine_images(*(
+            cls.solid(source, scale, width) if isinstance(source, str) else source.gen_image(length, scale=scale, direction=direction)
+            for source, length, direction in cls.candle_parts(up_length, body_length, down_length, style)
+        ))
         return image, CandleStructure(
             up=up_length,
             body=body_length,
             down=down_length,
-            scale=cls.scale,
+            scale=scale,
             width=image.width
         )
 
@@ -119,3 +228,6 @@ class CandleGraphicsResources:
             image.paste(img, ((max_width - img.width) // 2, y))
             y += img.height
         return image
+
+
+Profiler.add_source('sprites', CandleGraphicsResources.cache_info)
@@ -0,0 +1,356 @@
+from array import array
+from typing import IO, Iterable, Sequence, overload
+import contextlib
+import bisect
+from ._candle import Candle
+from ._enum import CandleErrorStatus
+from ._resources import CandleGraphicsResources
+from ._timestamp import InvalidTimestampError, TimestampFormat, parse_timestamps
+from ._aggregate import Interval, aggregate_events
+from asset.profiler import instrument, profiled
+import datetime
+import csv
+
+try:
+    import numpy as np
+except ImportError: # numpy为可选依赖，缺失时退化为array('q')
+    np = None
+
+
+@instrument
+class CandleSeries:
+    """
+    列式K线序列
+
+    timestamp/open/high/low/close 以连续的int64数组保存 (优先NumPy，缺失时为array('q'))，
+    派生列、涨跌颜色、校验状态等均按列一次性计算
+    """
+    COLUMNS = ('timestamp', 'open', 'high', 'low', 'close')
+
+    def __init__(
+        self,
+        timestamp: Iterable[int],
+        open: Iterable[int],
+        high: Iterable[int],
+        low: Iterable[int],
+        close: Iterable[int],
+        *,
+        sort: bool = True
+    ) -> None:
+        """
+        :param sort: 是否按timestamp稳定排序
+        """
+        columns = [self._column(values) for values in (timestamp, open, high, low, close)]
+        if len({len(column) for column in columns}) > 1:
+            raise ValueError("Columns must have the same length")
+        if sort and not self._is_sorted(columns[0]):
+            if np is not None:
+                order = np.argsort(columns[0], kind='stable')
+                columns = [column[order] for column in columns]
+            else:
+                order = sorted(range(len(columns[0])), key=columns[0].__getitem__)
+                columns = [array('q', (column[i] for i in order)) for column in columns]
+        self.timestamp, self.open, self.high, self.low, self.close = columns
+
+    @staticmethod
+    def _column(values: Iterable[int]):
+        if np is not None:
+            return np.asarray(values if hasattr(values, '__len__') else list(values), dtype=np.int64)
+        return values if isinstance(values, array) and values.typecode == 'q' else array('q', values)
+
+    @staticmethod
+    def _is_sorted(column) -> bool:
+        if np is not None:
+            return bool(np.all(column[1:] >= column[:-1]))
+        return all(a <= b for a, b in zip(column, column[1:]))
+
+    @classmethod
+    def from_candles(cls, candles: Iterable[Candle]) -> 'CandleSeries':
+        """
+        由K线数据创建序列
+        """
+        return cls.from_rows((candle.timestamp, candle.open, candle.high, candle.low, candle.close) for candle in candles)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[int]]) -> 'CandleSeries':
+        """
+        由 (timestamp, open, high, low, close) 行创建序列
+        """
+        columns = [array('q') for _ in cls.COLUMNS]
+        for row in rows:
+            for column, value in zip(columns, row):
+                column.append(value)
+        return cls(*columns)
+
+    @classmethod
+    def from_events(
+        cls,
+        events: 'str | IO[str] | Iterable[tuple[int, int]]',
+        interval: 'Interval | str',
+        *,
+        tz: datetime.tzinfo | None = None,
+        **options
+    ) -> 'CandleSeries':
+        """
+        由分数事件(timestamp, score)流式聚合创建序列，事件不会整体读入内存
+
+        :param events: 事件CSV的路径或文本流，或 (timestamp, score) 的迭代器
+        :param interval: 划分方式 (如 `1d`、`count:10`、`session:30m`)
+        :param tz: 时间的时区
+        :param options: CandleAggregator的其它参数 (initial、delta、fill_gaps、drop_late)
+        """
+        return cls.from_candles(aggregate_events(events, interval, tz=tz, **options))
+
+    @classmethod
+    @profiled()
+    def from_csv(
+        cls,
+        csv_file: str | IO[str],
+        *,
+        tz: datetime.tzinfo | None = None,
+        timestamp_format: TimestampFormat | None = None
+    ) -> 'CandleSeries':
+        """
+        读取CSV文件 (timestamp, open, high, low, close，含标题行)
+
+        csv_file可以是文件路径，也可以是已打开的文本流 (如标准输入，不会被关闭)
+
+        时间戳格式依据前几行检测一次 (秒/毫秒时间戳、ISO 8601、`Y/m/d`、`Y.m.d`)，整列按该格式解析
+
+        :param tz: 无时区时间的时区 (默认为本地时间)
+        :param timestamp_format: 指定时间戳格式 (默认自动检测)
+        """
+        rows: list[list[str]] = []
+        columns = [array('q') for _ in cls.COLUMNS[1:]]
+        if isinstance(csv_file, str):
+            source = open(csv_file, 'r', encoding='utf-8')
+        else:
+            source = contextlib.nullcontext(csv_file)
+        with source as f:
+            reader = csv.reader(f)
+            _ = next(reader) # skip header
+            for row in reader:
+                if len(row) != 5:
+                    continue
+                try:
+                    values = [int(value) for value in row[1:]]
+                except ValueError as e:
+                    raise ValueError(f"Invalid row: {row}") from e
+                for column, value in zip(columns, values):
+                    column.append(value)
+                rows.append(row)
+        try:
+            timestamps = parse_timestamps([row[0] for row in rows], tz=tz, fmt=timestamp_format)
+        except InvalidTimestampError as e:
+            raise ValueError(f"Invalid row: {rows[e.index]}") from e
+        return cls(timestamps, *columns)
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def extend(self, rows: Iterable[Sequence[int]]) -> None:
+        """
+        在末尾追加 (timestamp, open, high, low, close) 行 (不重新排序，均摊O(新增行数))
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        if np is None:
+            for column, values in zip(self.columns, zip(*rows)):
+                column.extend(values)
+            return
+        size, total = len(self), len(self) + len(rows)
+        buffers = getattr(self, "_buffers", None)
+        if buffers is None or len(buffers[0]) < total:
+            # 容量倍增，列为缓冲区的视图
+            capacity = max(total, 2 * size, 16)
+            buffers = [np.empty(capacity, dtype=np.int64) for _ in self.COLUMNS]
+            for buffer, column in zip(buffers, self.columns):
+                buffer[:size] = column
+            self._buffers = buffers
+        for buffer, values in zip(buffers, zip(*rows)):
+            buffer[size:total] = values
+        self.timestamp, self.open, self.high, self.low, self.close = (buffer[:total] for buffer in buffers)
+
+    @overload
+    def __getitem__(self, index: int) -> Candle: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> 'CandleSeries': ...
+
+    def __getitem__(self, index: int | slice) -> 'Candle | CandleSeries':
+        if isinstance(index, slice):
+            return CandleSeries(*(self._column(column[index]) for column in self.columns), sort=False)
+        return Candle.model_construct(**{name: int(column[index]) for name, column in zip(self.COLUMNS, self.columns)})
+
+    @property
+    def columns(self) -> tuple:
+        return self.timestamp, self.open, self.high, self.low, self.close
+
+    def candles(self) -> list[Candle]:
+        """
+        构建K线数据列表 (数据已校验为整数，跳过校验)
+        """
+        return [
+            Candle.model_construct(timestamp=t, open=o, high=h, low=l, close=c)
+            for t, o, h, l, c in zip(*(column.tolist() for column in self.columns))
+        ]
+
+    def quantize(self, step: int) -> 'CandleSeries':
+        """
+        分数按step向下取整到整数格 (时间不变)，保持 low <= open/close <= high
+
+        :param step: 每格的分数
+        """
+        if step < 1:
+            raise ValueError(f"Invalid step: {step}")
+        if step == 1:
+            return self
+        if np is not None:
+            return CandleSeries(self.timestamp, *(column // step for column in self.columns[1:]), sort=False)
+        return CandleSeries(self.timestamp, *(array('q', (value // step for value in column)) for column in self.columns[1:]), sort=False)
+
+    def downsample(self, factor: int) -> 'CandleSeries':
+        """
+        每factor根相邻K线合并为一根 (开盘取第一根、收盘取最后一根、最高/最低取极值，时间为第一根的时间)，
+        末尾不足factor根的部分同样合并为一根
+
+        :param factor: 合并的K线数
+        """
+        if factor < 1:
+            raise ValueError(f"Invalid factor: {factor}")
+        size = len(self)
+        if np is not None:
+            starts = np.arange(0, size, factor)
+            ends = np.minimum(starts + factor, size) - 1
+            return CandleSeries(
+                self.timestamp[starts],
+                self.open[starts],
+                np.maximum.reduceat(self.high, starts) if size else self.high,
+                np.minimum.reduceat(self.low, starts) if size else self.low,
+                self.close[ends],
+                sort=False
+            )
+        starts = range(0, size, factor)
+        return CandleSeries(
+            array('q', (self.timestamp[i] for i in starts)),
+            array('q', (self.open[i] for i in starts)),
+            array('q', (max(self.high[i:i + factor]) for i in starts)),
+            array('q', (min(self.low[i:i + factor]) for i in starts)),
+            array('q', (self.close[min(i + factor, size) - 1] for i in starts)),
+            sort=False
+        )
+
+    def bisect(self, timestamp: int) -> int:
+        """
+        第一个不早于timestamp的K线索引
+        """
+        if np is not None:
+            return int(np.searchsorted(self.timestamp, timestamp, side='left'))
+        return bisect.bisect_left(self.timestamp, timestamp)
+
+    @property
+    def y_max(self) -> int:
+        """
+        最高分 (空序列抛出ValueError)
+        """
+        if not len(self):
+            raise ValueError("Empty series has no y_max")
+        if np is not None:
+            return int(self.high.max())
+        return max(self.high)
+
+    @property
+    def y_min(self) -> int:
+        """
+        最低分 (空序列抛出ValueError)
+        """
+        if not len(self):
+            raise ValueError("Empty series has no y_min")
+        if np is not None:
+            return int(self.low.min())
+        return min(self.low)
+
+    def y_indexes(self, y_max: int, scale: int) -> list[int]:
+        """
+        Y轴索引列表
+
+        :param y_max: 图像顶部对应的分数
+        :param scale: 像分比例
+        """
+        if np is not None:
+            return ((y_max - self.high) * scale).tolist()
+        return [(y_max - high) * scale for high in self.high]
+
+    @property
+    def up_length(self):
+        if np is not None:
+            return self.high - np.maximum(self.open, self.close)
+        return array('q', (h - max(o, c) for o, h, c in zip(self.open, self.high, self.close)))
+
+    @property
+    def body_length(self):
+        if np is not None:
+            return self.close - self.open
+        return array('q', (c - o for o, c in zip(self.open, self.close)))
+
+    @property
+    def down_length(self):
+        if np is not None:
+            return np.minimum(self.open, self.close) - self.low
+        return array('q', (min(o, c) - l for o, l, c in zip(self.open, self.low, self.close)))
+
+    @property
+    def should_up(self):
+        body, up, down = self.body_length, self.up_length, self.down_length
+        if np is not None:
+            return np.where(body != 0, body, up - down)
+        return array('q', (b or u - d for b, u, d in zip(body, up, down)))
+
+    def colors(self, green_up: bool | None = None) -> list[str]:
+        """
+        涨跌颜色列表 (与Candle.color一致)
+
+        :param green_up: 是否为绿涨红跌 (默认为 assets.candlestick.green_up)
+        """
+        if green_up is None:
+            green_up = CandleGraphicsResources.green_up
+        should_up = self.should_up
+        if np is not None:
+            red = (should_up > 0) ^ green_up
+            codes = np.where(red, 1, np.where(should_up == 0, 0, 2))
+            names = ('black', 'red', 'green')
+            return [names[code] for code in codes.tolist()]
+        return [(s > 0) ^ green_up and 'red' or (s == 0) and 'black' or 'green' for s in should_up]
+
+    @property
+    def checks(self):
+        """
+        校验状态码列表 (CandleErrorStatus.value)
+        """
+        o, h, l, c = self.open, self.high, self.low, self.close
+        if np is not None:
+            negative = (o < 0) | (h < 0) | (l < 0) | (c < 0)
+            return np.select(
+                [negative, h < np.maximum(o, c), l > np.minimum(o, c)],
+                [CandleErrorStatus.SCORE_NEGATIVE.value, CandleErrorStatus.HIGH_LESS_THAN_MAX.value, CandleErrorStatus.LOW_GREATER_THAN_MIN.value],
+                CandleErrorStatus.NORMAL.value
+            )
+        return array('q', (
+            CandleErrorStatus.SCORE_NEGATIVE.value if o_ < 0 or h_ < 0 or l_ < 0 or c_ < 0 else
+            CandleErrorStatus.HIGH_LESS_THAN_MAX.value if h_ < max(o_, c_) else
+            CandleErrorStatus.LOW_GREATER_THAN_MIN.value if l_ > min(o_, c_) else
+            CandleErrorStatus.NORMAL.value
+            for o_, h_, l_, c_ in zip(o, h, l, c)
+        ))
+
+    @profiled()
+    def errors(self) -> list[tuple[int, CandleErrorStatus]]:
+        """
+        错误的K线 (timestamp, 校验状态)
+        """
+        checks = self.checks
+        if np is not None:
+            bad = np.flatnonzero(checks != CandleErrorStatus.NORMAL.value)
+            return [(int(self.timestamp[i]), CandleErrorStatus(int(checks[i]))) for i in bad]
+        return [(self.timestamp[i], CandleErrorStatus(code)) for i, code in enumerate(checks) if code != CandleErrorStatus.NORMAL.value]
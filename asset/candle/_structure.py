@@ -1,8 +1,11 @@
 from PIL import Image
-from pydantic import BaseModel
+from typing import NamedTuple
 
 
-class CandleStructure(BaseModel):
+class CandleStructure(NamedTuple):
+    """
+    单根K线的绘制参数 (不可变值对象)
+    """
     up: int
     body: int
     down: int
@@ -25,6 +28,12 @@ class CandleStructure(BaseModel):
     def height(self) -> int:
         return self.up_height + self.body_height + self.down_height
 
+    def rescale(self, scale: int) -> 'CandleStructure':
+        """
+        换算到另一像分比例下的绘制参数
+        """
+        return self._replace(scale=scale, width=self.width // self.scale * scale)
+
     @property
     def empty_canvas(self) -> Image.Image:
         return Image.new("RGBA", (self.width, self.height))
@@ -0,0 +1,174 @@
+from typing import Iterable, NamedTuple
+from ._group import CandleGroup
+from ._resources import CandleGraphicsResources, CandleStyle
+from asset.number import NumberGraphicsResources
+from asset.profiler import instrument, profiled
+from PIL import Image
+
+
+class Theme(NamedTuple):
+    """
+    渲染主题 (为None的项沿用配置文件)
+
+    :param name: 主题名称 (用于区分输出)
+    :param green_up: 是否为绿涨红跌 (国际标准)
+    :param arrow: 影线的素材名
+    :param green: 绿色实体的素材名
+    :param red: 红色实体的素材名
+    :param font_color: 坐标轴文字的颜色
+    """
+    name: str
+    green_up: bool | None = None
+    arrow: str | None = None
+    green: str | None = None
+    red: str | None = None
+    font_color: str | tuple[int, int, int] | None = None
+
+
+THEME_FIELDS = ('green_up', 'arrow', 'green', 'red', 'font_color')
+
+
+def parse_theme(spec: str) -> Theme:
+    """
+    解析命令行的主题，如 `intl:green_up=true,font_color=#000000`、`plain` (只有名称时即为配置文件的主题)
+    """
+    name, _, options = spec.partition(':')
+    if not name.strip():
+        raise ValueError(f"Invalid theme: {spec}")
+    values: dict = {}
+    for item in filter(None, (item.strip() for item in options.split(','))):
+        key, _, value = item.partition('=')
+        key = key.strip().replace('-', '_')
+        if key not in THEME_FIELDS or not value:
+            raise ValueError(f"Invalid theme option {item}")
+        if key == 'green_up':
+            if value.lower() not in ('true', 'false', '1', '0'):
+                raise ValueError(f"Invalid theme option {item}")
+            values[key] = value.lower() in ('true', '1')
+        elif key == 'font_color' and value.startswith('#'):
+            values[key] = tuple(int(value[i:i + 2], 16) for i in (1, 3, 5))
+        else:
+            values[key] = value
+    return Theme(name.strip(), **values)
+
+
+def resolve_theme(theme: Theme) -> CandleStyle:
+    """
+    主题对应的素材与配色 (未给定的项沿用配置文件，不修改进程级的配置)
+    """
+    R = CandleGraphicsResources
+    sprites = []
+    for name in ('arrow', 'green', 'red'):
+        if getattr(theme, name) is None:
+            sprites.append(getattr(R, name))
+            continue
+        graphics = R.factory[getattr(theme, name)]
+        if graphics is None:
+            raise ValueError(f"Invalid graphics {getattr(theme, name)}")
+        sprites.append(graphics)
+    return CandleStyle(*sprites, R.green_up if theme.green_up is None else theme.green_up, theme.font_color)
+
+
+def _layer_keys(style: CandleStyle) -> dict[str, tuple]:
+    """
+    每张结果图像所依赖的素材与配色 (键相同的图像在主题间直接复用)
+    """
+    sprites = (style.arrow, style.green, style.red)
+    # 数值图像的颜色随涨跌色，摆放随K线图像的宽度 (不随素材的颜色)
+    widths = tuple(graphics.width.maximun for graphics in sprites)
+    return {
+        'candlestick': (sprites, style.green_up),
+        'number': (style.green_up, widths),
+        'merged': (sprites, style.green_up),
+        'coord': (style.font_color or NumberGraphicsResources.color,),
+        'horizontal': (style.green_up, style.width),
+    }
+
+
+@instrument
+class ThemedRenderer:
+    """
+    一个K线组的多主题渲染: 数据解析、量化几何、纵向布局与文本度量只计算一次，
+    每个主题只渲染与之相关的图像层，主题间相同的图像层直接复用
+
+    - 只改变文字颜色的主题复用全部K线、数值与日期图像，只重绘坐标轴
+    - 只改变涨跌色的主题复用影线素材的整列图像与文本遮罩 (与颜色无关)，只重新着色
+    - 主题以CandleStyle显式传入各K线组，不修改进程级的配置，可与其它渲染并发进行
+    - 主题渲染不使用磁盘缓存 (缓存键只包含配置文件中的主题)
+    """
+
+    def __init__(self, group: CandleGroup):
+        """
+        :param group: 源K线组 (提供序列、量化步长、渲染参数与已计算的纵向布局)
+        """
+        self.group = group
+        self._views: list[tuple[dict[str, tuple], CandleGroup]] = []
+
+    def _view(self, style: CandleStyle) -> CandleGroup:
+        """
+        主题下共享源K线组数据与纵向布局的K线组，并接入主题间可复用的图像层
+        """
+        group = self.group
+        view = CandleGroup(series=group.series, logical=group._logical, executor=group._executor, step=group.step, style=style)
+        view._geometry, view._candles = group.geometry, group.candles
+        view._y_max, view._y_min, view._y_indexes = group.y_max, group.y_min, group.y_indexes
+        keys = _layer_keys(style)
+        for previous, other in self._views:
+            if previous['candlestick'] == keys['candlestick']:
+                for name in ('_images', '_structures', '_logical_image', '_image', '_big_image'):
+                    setattr(view, name, getattr(other, name, None))
+            if previous['number'] == keys['number']:
+                for name in ('_number_images', '_number_reach', '_number_image', '_number_layer'):
+                    setattr(view, name, getattr(other, name, None))
+            if previous['horizontal'] == keys['horizontal']:
+                view._horizontal = getattr(other, '_horizontal', None)
+            if previous['coord'] == keys['coord']:
+                view._coordinate = getattr(other, '_coordinate', None)
+        self._views.append((keys, view))
+        return view
+
+    @profiled()
+    def render(self, themes: Iterable[Theme], artifacts: Iterable[str] | None = None) -> dict[str, dict[str, Image.Image]]:
+        """
+        依次在各主题下生成结果图像
+
+        :param themes: 主题 (名称不可重复)
+        :param artifacts: 生成的图像 (ARTIFACTS中的名称，默认为全部)
+        :return: 主题名称 -> 图像名称 -> 图像
+        """
+        artifacts = tuple(artifacts or CandleGroup.ARTIFACTS)
+        results: dict[str, dict[str, Image.Image]] = {}
+        # 图像名称 -> 依赖的主题属性 -> 已生成的图像
+        done: dict[str, dict[tuple, Image.Image]] = {name: {} for name in artifacts}
+        for theme in themes:
+            if theme.name in results:
+                raise ValueError(f"Duplicate theme name: {theme.name}")
+            style = resolve_theme(theme)
+            keys = _layer_keys(style)
+            view = None
+            images: dict[str, Image.Image] = {}
+            for name in artifacts:
+                key = keys[name] if name != 'merged' else (keys['merged'], keys['number'])
+                if key not in done[name]:
+                    if view is None:
+                        view = self._view(style)
+                    done[name][key] = view.artifact(name)
+                images[name] = done[name][key]
+            results[theme.name] = images
+        return results
+
+
+def render_themes(
+    group: CandleGroup,
+    themes: Iterable[Theme],
+    artifacts: Iterable[str] | None = None
+) -> dict[str, dict[str, Image.Image]]:
+    """
+    将一个K线组渲染为多个主题 (见ThemedRenderer)
+
+    :return: 主题名称 -> 图像名称 -> 图像
+    """
+    return ThemedRenderer(group).render(themes, artifacts)
+
+
+__all__ = ["Theme", "parse_theme", "resolve_theme", "ThemedRenderer", "render_themes"]
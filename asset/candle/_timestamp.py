@@ -0,0 +1,155 @@
+from enum import Enum
+from typing import Callable
+import datetime
+
+
+class TimestampFormat(Enum):
+    EPOCH_SECONDS = "epoch-seconds"
+    EPOCH_MILLIS = "epoch-millis"
+    ISO = "iso"
+    SLASH = "slash"
+    DOT = "dot"
+
+
+class InvalidTimestampError(ValueError):
+    def __init__(self, index: int, text: str):
+        super().__init__(f"Invalid timestamp: {text}")
+        self.index = index
+
+
+# 时间戳超过该位数视为毫秒 (秒级时间戳在5138年之前都不超过11位)
+MILLIS_DIGITS = 12
+
+
+def _split_date(text: str, separator: str) -> datetime.datetime:
+    """
+    解析`Y/m/d`或`Y.m.d`(允许不补零)，可带` H:M:S`
+    """
+    date, _, time = text.partition(' ')
+    year, month, day = date.split(separator)
+    if time:
+        hour, minute, second = time.split(':')
+        return datetime.datetime(int(year), int(month), int(day), int(hour), int(minute), int(second))
+    return datetime.datetime(int(year), int(month), int(day))
+
+
+def _parse_iso(text: str) -> datetime.datetime:
+    """
+    ISO 8601 日期或日期时间 (不补零的`Y-m-d`退化为逐段解析)
+    """
+    try:
+        return datetime.datetime.fromisoformat(text)
+    except ValueError:
+        value = _split_date(text.replace('T', ' ').removesuffix('Z'), '-')
+        # 结尾的Z表示UTC，不按tz解释
+        return value.replace(tzinfo=datetime.timezone.utc) if text.endswith('Z') else value
+
+
+def _to_epoch(value: datetime.datetime, tz: datetime.tzinfo | None) -> int:
+    """
+    无时区的时间按tz解释 (tz为空时按本地时间)，带时区的时间保持自身时区
+    """
+    if value.tzinfo is None and tz is not None:
+        value = value.replace(tzinfo=tz)
+    return int(value.timestamp())
+
+
+def _epoch_seconds(text: str) -> int:
+    """
+    秒级时间戳 (位数达到毫秒的行抛出ValueError，交由逐行解析)
+    """
+    if len(text.strip()) >= MILLIS_DIGITS:
+        raise ValueError(f"Not an epoch-seconds timestamp: {text}")
+    return int(text)
+
+
+def _epoch_millis(text: str) -> int:
+    """
+    毫秒级时间戳，取整到秒 (位数不足的行抛出ValueError，交由逐行解析)
+    """
+    if len(text.strip()) < MILLIS_DIGITS:
+        raise ValueError(f"Not an epoch-millis timestamp: {text}")
+    return int(text) // 1000
+
+
+def _parser(fmt: TimestampFormat, tz: datetime.tzinfo | None) -> Callable[[str], int]:
+    match fmt:
+        case TimestampFormat.EPOCH_SECONDS:
+            return _epoch_seconds
+        case TimestampFormat.EPOCH_MILLIS:
+            return _epoch_millis
+        case TimestampFormat.ISO:
+            return lambda text: _to_epoch(_parse_iso(text), tz)
+        case TimestampFormat.SLASH:
+            return lambda text: _to_epoch(_split_date(text, '/'), tz)
+        case TimestampFormat.DOT:
+            return lambda text: _to_epoch(_split_date(text, '.'), tz)
+
+
+def _guess(text: str) -> TimestampFormat | None:
+    text = text.strip()
+    if text.isdigit():
+        return TimestampFormat.EPOCH_MILLIS if len(text) >= MILLIS_DIGITS else TimestampFormat.EPOCH_SECONDS
+    if '-' in text:
+        return TimestampFormat.ISO
+    if '/' in text:
+        return TimestampFormat.SLASH
+    if '.' in text:
+        return TimestampFormat.DOT
+    return None
+
+
+def detect_format(samples: list[str]) -> TimestampFormat | None:
+    """
+    依据前几行检测时间戳格式 (取多数)
+    """
+    votes: dict[TimestampFormat, int] = {}
+    for sample in samples:
+        fmt = _guess(sample)
+        if fmt is not None:
+            votes[fmt] = votes.get(fmt, 0) + 1
+    if not votes:
+        return None
+    return max(votes, key=votes.__getitem__)
+
+
+def parse_timestamp(text: str, tz: datetime.tzinfo | None = None) -> int:
+    """
+    逐行解析单个时间戳 (不依赖检测结果)
+    """
+    fmt = _guess(text)
+    if fmt is None:
+        raise ValueError(f"Invalid timestamp: {text}")
+    return _parser(fmt, tz)(text.strip())
+
+
+def parse_timestamps(
+    texts: list[str],
+    *,
+    tz: datetime.tzinfo | None = None,
+    fmt: TimestampFormat | None = None,
+    sample_size: int = 16
+) -> list[int]:
+    """
+    解析整列时间戳: 先依据前几行检测格式，再以该格式的快速路径解析整列，不匹配的行逐行处理
+
+    :param tz: 无时区时间的时区 (默认为本地时间)
+    :param fmt: 指定格式 (默认自动检测)
+    :param sample_size: 用于检测格式的行数
+    """
+    if fmt is None:
+        fmt = detect_format(texts[:sample_size])
+    parse = _parser(fmt, tz) if fmt is not None else lambda text: parse_timestamp(text, tz)
+    result: list[int] = []
+    for index, text in enumerate(texts):
+        try:
+            result.append(parse(text))
+        except ValueError:
+            try:
+                result.append(parse_timestamp(text, tz))
+            except ValueError as e:
+                raise InvalidTimestampError(index, text) from e
+    return result
+
+
+__all__ = ["TimestampFormat", "InvalidTimestampError", "detect_format", "parse_timestamp", "parse_timestamps"]
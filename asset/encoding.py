@@ -0,0 +1,307 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import IO, Iterable, Mapping, NamedTuple
+from PIL import Image
+from asset.profiler import instrument, profiled
+import struct
+import zlib
+import sys
+import io
+
+try:
+    import numpy as np
+except ImportError: # numpy为可选依赖，缺失时精确调色板退化为八叉树量化+校验
+    np = None
+
+
+class EncodeOptions(NamedTuple):
+    """
+    单个图像的编码参数
+
+    :param format: 'png' 或 'webp' (WebP固定为无损)
+    :param compress_level: PNG的zlib压缩等级 (0-9，默认为Pillow的6)
+    :param optimize: PNG是否额外搜索最优的压缩参数 (更小、更慢)
+    :param palette: 颜色数不超过256时无损地转为调色板图像 (像素风的K线层通常只有几十种颜色)
+    :param colors: 有损量化到的颜色数 (0为不量化，优先于palette)
+    :param method: WebP的压缩方法 (0-6，越大越小、越慢)
+    """
+    format: str = 'png'
+    compress_level: int | None = None
+    optimize: bool = False
+    palette: bool = False
+    colors: int = 0
+    method: int = 4
+
+    @property
+    def extension(self) -> str:
+        return f'.{self.format}'
+
+
+# 预设 (速度/体积的取舍)
+PRESETS: dict[str, EncodeOptions] = {
+    'default': EncodeOptions(),
+    'fast': EncodeOptions(compress_level=1),
+    'small': EncodeOptions(compress_level=9, optimize=True),
+    'palette': EncodeOptions(palette=True),
+    'quantize': EncodeOptions(compress_level=9, optimize=True, colors=256),
+    'webp': EncodeOptions(format='webp'),
+    'webp-fast': EncodeOptions(format='webp', method=0),
+}
+
+
+def get_options(options: str | EncodeOptions | None) -> EncodeOptions:
+    """
+    预设名称或编码参数 (None为默认)
+    """
+    if options is None:
+        return PRESETS['default']
+    if isinstance(options, EncodeOptions):
+        return options
+    if options not in PRESETS:
+        raise ValueError(f"Invalid encode preset {options}")
+    return PRESETS[options]
+
+
+def parse_formats(spec: str, artifacts: Iterable[str]) -> dict[str, EncodeOptions]:
+    """
+    解析命令行的编码配置，如 `fast`、`palette,merged=webp`
+
+    不带`=`的项应用于所有图像，带`=`的项只应用于对应图像 (后者优先)
+    """
+    artifacts = tuple(artifacts)
+    default = PRESETS['default']
+    specific: dict[str, EncodeOptions] = {}
+    for item in filter(None, (item.strip() for item in spec.split(','))):
+        artifact, _, preset = item.rpartition('=')
+        if not artifact:
+            default = get_options(preset)
+        elif artifact in artifacts:
+            specific[artifact] = get_options(preset)
+        else:
+            raise ValueError(f"Invalid artifact {artifact}")
+    return {artifact: specific.get(artifact, default) for artifact in artifacts}
+
+
+def _exact_palette(image: Image.Image) -> tuple[Image.Image, bytes] | None:
+    """
+    无损转为调色板图像 (颜色数超过256或无法精确转换时返回None)
+
+    :return: 调色板图像, 每个索引的透明度
+    """
+    image = image.convert('RGBA') if image.mode != 'RGBA' else image
+    colors = image.getcolors(256)
+    if colors is None:
+        return None
+    if np is not None:
+        # 以RGBA打包的uint32作为颜色键，在排序后的颜色表中查找索引
+        table = np.sort(np.array([color for _, color in colors], dtype=np.uint8).view(np.uint32).ravel())
+        pixels = np.asarray(image).view(np.uint32).reshape(image.height, image.width)
+        indexes = np.searchsorted(table, pixels).astype(np.uint8)
+        rgba = table.view(np.uint8).reshape(-1, 4)
+        paletted = Image.frombytes('P', image.size, indexes.tobytes())
+        paletted.putpalette(rgba[:, :3].tobytes())
+        return paletted, rgba[:, 3].tobytes()
+    paletted = image.quantize(len(colors), method=Image.Quantize.FASTOCTREE)
+    if paletted.convert('RGBA').tobytes() != image.tobytes():
+        return None
+    return paletted, bytes(paletted.getpalette('RGBA')[3::4])
+
+
+@profiled()
+def encode(image: Image.Image, options: str | EncodeOptions | None = None, target: IO[bytes] | None = None) -> bytes | None:
+    """
+    按编码参数编码图像
+
+    :param target: 写入的二进制流 (为None时返回编码后的字节)
+    """
+    options = get_options(options)
+    stream = io.BytesIO() if target is None else target
+    if options.format == 'webp':
+        image.save(stream, format='WEBP', lossless=True, quality=100, method=options.method, exact=True)
+    elif options.format == 'png':
+        params: dict = {'optimize': options.optimize}
+        if options.compress_level is not None:
+            params['compress_level'] = options.compress_level
+        if options.colors:
+            image = image.convert('RGBA').quantize(options.colors, method=Image.Quantize.FASTOCTREE)
+        elif options.palette:
+            paletted = _exact_palette(image)
+            if paletted is not None:
+                image, params['transparency'] = paletted
+        image.save(stream, format='PNG', **params)
+    else:
+        raise ValueError(f"Invalid format {options.format}")
+    return stream.getvalue() if target is None else None
+
+
+@profiled()
+def encode_all(
+    images: Mapping[str, Image.Image],
+    options: Mapping[str, str | EncodeOptions] | str | EncodeOptions | None = None,
+    executor: Executor | None = None
+) -> dict[str, bytes]:
+    """
+    并发编码多张图像 (zlib/libwebp编码时释放GIL)
+
+    :param options: 每张图像的编码参数，或统一的编码参数
+    :param executor: 执行器 (默认为临时的线程池)
+    """
+    def options_of(name: str) -> EncodeOptions:
+        if isinstance(options, Mapping):
+            return get_options(options.get(name))
+        return get_options(options)
+
+    if executor is None:
+        with ThreadPoolExecutor(max_workers=len(images) or 1, thread_name_prefix="encode") as executor:
+            return encode_all(images, options, executor)
+    futures = {name: executor.submit(encode, image, options_of(name)) for name, image in images.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+# 动画格式 -> 扩展名
+ANIMATION_FORMATS = {'apng': '.png', 'gif': '.gif', 'rgba': '.rgba'}
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# 原始帧序列的文件头: 魔数, 宽, 高, 帧数 (小端uint32)；每帧: x, y, 宽, 高 + 逐行的RGBA字节
+RGBA_HEADER = struct.Struct('<4sIII')
+RGBA_FRAME = struct.Struct('<IIII')
+
+
+def _png_chunks(data: bytes) -> Iterable[tuple[bytes, bytes]]:
+    """
+    逐个读取PNG的块 (类型, 数据)
+    """
+    position = len(PNG_SIGNATURE)
+    while position < len(data):
+        length, kind = struct.unpack_from('>I4s', data, position)
+        yield kind, data[position + 8:position + 8 + length]
+        position += length + 12
+
+
+def _png_chunk(target: IO[bytes], kind: bytes, data: bytes) -> None:
+    target.write(struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data)))
+
+
+def _gif_frame(image: Image.Image) -> tuple[int, bytes, bytes]:
+    """
+    用Pillow将单张调色板图像编码为GIF，取出其颜色表与LZW数据 (用于拼接为动画的一帧)
+
+    :return: 颜色表大小位 (表长为 2 ** (bits + 1)), 颜色表, LZW最小码长与数据子块
+    """
+    stream = io.BytesIO()
+    image.save(stream, format='GIF', interlace=False)
+    data = stream.getvalue()
+    flags = data[10]
+    position = 13
+    bits, table = flags & 7, b''
+    if flags & 0x80:
+        table = data[position:position + 3 * (2 << bits)]
+        position += len(table)
+    while data[position] == 0x21: # 扩展块
+        position += 2
+        while data[position]:
+            position += data[position] + 1
+        position += 1
+    flags = data[position + 9]
+    position += 10
+    if flags & 0x80:
+        bits = flags & 7
+        table = data[position:position + 3 * (2 << bits)]
+        position += len(table)
+    start = position
+    position += 1
+    while data[position]:
+        position += data[position] + 1
+    return bits, table, data[start:position + 1]
+
+
+@profiled()
+def encode_animation(
+    frames: Iterable[tuple[tuple[int, int, int, int], Image.Image]],
+    size: tuple[int, int],
+    count: int,
+    target: IO[bytes],
+    format: str = 'apng',
+    duration: int = 100,
+    loop: int = 0,
+    background: tuple[int, int, int] = (255, 255, 255)
+) -> None:
+    """
+    流式编码增量帧: 每帧只编码变化的矩形 (脏矩形)，写入后即丢弃，内存与帧数无关
+
+    - apng: 每帧为脏矩形的fcTL/fdAT (替换该矩形的像素，保留透明度)
+    - gif: 每帧为脏矩形的局部颜色表与图像 (GIF没有半透明，先合成到background上)
+    - rgba: 见RGBA_HEADER/RGBA_FRAME的原始帧序列 (便于管道给视频编码器等程序)
+
+    :param frames: (脏矩形, 矩形内的RGBA像素) 的迭代器，第一帧之前画布为全透明
+    :param size: 画布尺寸
+    :param count: 帧数 (APNG需要预先写入)
+    :param target: 写入的二进制流
+    :param format: ANIMATION_FORMATS之一
+    :param duration: 每帧的时长 (毫秒)
+    :param loop: 循环次数 (0为无限循环)
+    :param background: GIF的背景色
+    """
+    if format not in ANIMATION_FORMATS:
+        raise ValueError(f"Invalid animation format {format}")
+    width, height = size
+    written = 0
+    if format == 'rgba':
+        target.write(RGBA_HEADER.pack(b'RGBA', width, height, count))
+        for box, image in frames:
+            target.write(RGBA_FRAME.pack(*box[:2], *image.size))
+            target.write(image.convert('RGBA').tobytes())
+            written += 1
+    elif format == 'apng':
+        target.write(PNG_SIGNATURE)
+        _png_chunk(target, b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+        _png_chunk(target, b'acTL', struct.pack('>II', count, loop))
+        sequence = 0
+        for box, image in frames:
+            if written == 0 and box != (0, 0, width, height):
+                # 第一帧必须覆盖整个画布
+                canvas = Image.new('RGBA', size)
+                canvas.paste(image, box[:2])
+                box, image = (0, 0, width, height), canvas
+            # 帧控制: 序号, 宽, 高, x, y, 时长(分子/分母), 处置(不处置), 混合(直接替换)
+            _png_chunk(target, b'fcTL', struct.pack('>IIIIIHHBB', sequence, *image.size, *box[:2], duration, 1000, 0, 0))
+            sequence += 1
+            stream = io.BytesIO()
+            image.convert('RGBA').save(stream, format='PNG')
+            for kind, data in _png_chunks(stream.getvalue()):
+                if kind != b'IDAT':
+                    continue
+                if written == 0:
+                    _png_chunk(target, b'IDAT', data)
+                else:
+                    _png_chunk(target, b'fdAT', struct.pack('>I', sequence) + data)
+                    sequence += 1
+            written += 1
+        _png_chunk(target, b'IEND', b'')
+    else:
+        target.write(b'GIF89a' + struct.pack('<HHBBB', width, height, 0, 0, 0))
+        target.write(b'\x21\xff\x0bNETSCAPE2.0\x03\x01' + struct.pack('<H', loop) + b'\x00')
+        for box, image in frames:
+            if written == 0 and box != (0, 0, width, height):
+                canvas = Image.new('RGBA', size)
+                canvas.paste(image, box[:2])
+                box, image = (0, 0, width, height), canvas
+            image = image.convert('RGBA')
+            flattened = Image.new('RGB', image.size, background)
+            flattened.paste(image, mask=image)
+            paletted = _exact_palette(flattened)
+            paletted = flattened.quantize(256, method=Image.Quantize.FASTOCTREE) if paletted is None else paletted[0]
+            bits, table, pixels = _gif_frame(paletted)
+            # 图形控制扩展: 不处置 (下一帧叠加在其上), 时长以厘秒计
+            target.write(b'\x21\xf9\x04\x04' + struct.pack('<H', round(duration / 10)) + b'\x00\x00')
+            target.write(b'\x2c' + struct.pack('<HHHHB', *box[:2], *image.size, 0x80 | bits) + table + pixels)
+            written += 1
+        target.write(b'\x3b')
+    if written != count:
+        raise ValueError(f"Expected {count} frames, got {written}")
+
+
+instrument(sys.modules[__name__])
+
+
+__all__ = ["EncodeOptions", "PRESETS", "ANIMATION_FORMATS", "get_options", "parse_formats", "encode", "encode_all", "encode_animation"]
@@ -2,32 +2,63 @@ from PIL import Image
 from graphics import CommonGraphics
 import json as jsonlib
 from typing import Any
+import threading
 import os
 
 
 class ItemGraphicsFactory:
     def __init__(self, assets_floder: str):
+        """
+        资源工厂 (按需构建)
+
+        首次使用时扫描一次assets_floder得到清单，CommonGraphics只在按名称取用时才解码PNG并构建
+
+        :param assets_floder: 资源目录
+        """
         self._assets_floder = assets_floder
         self._mapper: dict[str, CommonGraphics] = {}
-        self._properties: dict[str, dict[str, Any]] = {}
-        # 历遍assets_floder下的所有文件
-        ## 历遍所有的png文件，构建CommonGraphics对象
-        for file in os.listdir(assets_floder):
-            if file.endswith(".png"):
-                name = file[:-4]
-                properties: dict[str, Any] = jsonlib.load(open(f"{assets_floder}/{name}.json", encoding="utf-8"))
-                image = Image.open(f"{assets_floder}/{file}")
-                self._mapper[name] = CommonGraphics(image, properties)
-        ## 历遍剩余的json文件，构建properties
-        for file in os.listdir(assets_floder):
-            if file.endswith(".json"):
-                name = file[:-5]
-                if name not in self._mapper:
-                    self._properties[name] = jsonlib.load(open(f"{assets_floder}/{file}", encoding="utf-8"))
+        self._lock = threading.Lock()
+
+    def _load_json(self, name: str) -> dict[str, Any]:
+        with open(os.path.join(self._assets_floder, f"{name}.json"), encoding="utf-8") as f:
+            return jsonlib.load(f)
+
+    @property
+    def manifest(self) -> dict[str, str]:
+        """
+        资源清单: 名称 -> 类型 ("graphics": png+json, "properties": 单独的json)
+        """
+        if getattr(self, "_manifest", None) is None:
+            files = os.listdir(self._assets_floder)
+            graphics = {file[:-4] for file in files if file.endswith(".png")}
+            manifest = {name: "graphics" for name in sorted(graphics)}
+            for file in sorted(files):
+                if file.endswith(".json") and file[:-5] not in graphics:
+                    manifest[file[:-5]] = "properties"
+            self._manifest = manifest
+        return self._manifest
+
+    def __contains__(self, key: str) -> bool:
+        return self.manifest.get(key) == "graphics"
 
     def __getitem__(self, key: str) -> CommonGraphics | None:
-        return self._mapper.get(key, None)
+        if key in self._mapper:
+            return self._mapper[key]
+        if key not in self:
+            return None
+        with self._lock:
+            if key not in self._mapper:
+                properties = self._load_json(key)
+                with Image.open(os.path.join(self._assets_floder, f"{key}.png")) as image:
+                    image.load()
+                self._mapper[key] = CommonGraphics(image, properties)
+        return self._mapper[key]
 
     @property
     def properties(self) -> dict[str, dict[str, Any]]:
+        if getattr(self, "_properties", None) is None:
+            self._properties = {
+                name: self._load_json(name)
+                for name, kind in self.manifest.items() if kind == "properties"
+            }
         return self._properties
@@ -1,15 +1,18 @@
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageChops, ImageDraw, ImageFilter, ImageFont
 from .items import ItemGraphicsFactory
 from .utils import get_assets_path, get_i18n
-from pydantic import BaseModel
+from .profiler import Profiler, instrument, profiled
+from graphics import LRUCache
+from typing import NamedTuple
+import threading
 import datetime
 import os
 
 
-__all__ = ["NumberGraphicsResources"]
+__all__ = ["NumberGraphicsResources", "GlyphAtlas"]
 
 
-class Margin(BaseModel):
+class Margin(NamedTuple):
     left: int = 0
     top: int = 0
     right: int = 0
@@ -24,28 +27,140 @@ class Margin(BaseModel):
         return self.top + self.bottom
 
 
+def outline_blend(mask: Image.Image, text_color: str | tuple, outline_color: str | tuple, outline_width: int) -> Image.Image:
+    """
+    逐偏移叠加(2·outline_width+1)²次遮罩的描边 (与最初的逐次draw.text逐像素一致)
+
+    结果的每个像素只取决于遮罩中以其为左上角、边长2·outline_width+1的窗口 (遮罩为0的叠加不改变像素)
+
+    :param mask: 文本的覆盖率遮罩
+    :return: 大小为遮罩四边各减去outline_width的图像
+    """
+    image = Image.new('RGBA', (mask.width - 2 * outline_width, mask.height - 2 * outline_width))
+    for dx in range(-outline_width, outline_width + 1):
+        for dy in range(-outline_width, outline_width + 1):
+            if dx != 0 or dy != 0:
+                x, y = dx - outline_width, dy - outline_width
+                image.paste(outline_color, (x, y, x + mask.width, y + mask.height), mask)
+    image.paste(text_color, (-outline_width, -outline_width, mask.width - outline_width, mask.height - outline_width), mask)
+    return image
+
+
+class GlyphAtlas:
+    """
+    字形图集: 预渲染每个字形的覆盖率遮罩 (与颜色无关)，以及按颜色描边后的字形
+
+    字符串的遮罩由字形按字体度量(步进+字距)逐个以取最大值的方式拼接，与FreeType整串渲染逐像素一致
+    """
+
+    def __init__(self, font: ImageFont.FreeTypeFont, charset: str):
+        self.font = font
+        # (文字颜色, 描边颜色, 描边宽度) -> 字符 -> (描边后的字形, 相对于笔位置的x, y)
+        self._outlined: dict[tuple, dict[str, tuple[Image.Image, int, int] | None]] = {}
+        self._outlined_lock = threading.Lock()
+        self._glyphs: dict[str, tuple[Image.Image, int, int]] = {}
+        self._advances: dict[str, float] = {}
+        self._kerning: dict[tuple[str, str], float] = {}
+        pad = font.size
+        for char in dict.fromkeys(charset):
+            canvas = Image.new('L', (3 * font.size, 3 * font.size))
+            ImageDraw.Draw(canvas).text((pad, pad), char, font=font, fill=255)
+            bbox = canvas.getbbox()
+            if bbox is None:
+                self._glyphs[char] = (Image.new('L', (0, 0)), 0, 0)
+            else:
+                self._glyphs[char] = (canvas.crop(bbox), bbox[0] - pad, bbox[1] - pad)
+            self._advances[char] = font.getlength(char)
+        for left in self._advances:
+            for right in self._advances:
+                self._kerning[left, right] = font.getlength(left + right) - self._advances[left] - self._advances[right]
+
+    def supports(self, text: str) -> bool:
+        """
+        图集是否包含文本的所有字形 (且字形均落在整数像素上)
+        """
+        return all(char in self._glyphs for char in text) and all(x == int(x) for x in self.offsets(text))
+
+    def offsets(self, text: str) -> list[float]:
+        """
+        每个字形的笔位置 (相对于文本起点)
+        """
+        offsets: list[float] = []
+        x = 0.0
+        previous = None
+        for char in text:
+            if previous is not None:
+                x += self._advances[previous] + self._kerning[previous, char]
+            offsets.append(x)
+            previous = char
+        return offsets
+
+    def render_mask(self, text: str, size: tuple[int, int], origin: tuple[int, int]) -> Image.Image:
+        """
+        将文本的遮罩拼接到指定大小的L图像上
+
+        :param size: 遮罩大小
+        :param origin: 文本起点 (与ImageDraw.text的xy一致)
+        """
+        mask = Image.new('L', size)
+        for char, x in zip(text, self.offsets(text)):
+            glyph, left, top = self._glyphs[char]
+            if glyph.width == 0:
+                continue
+            x0, y0 = origin[0] + int(x) + left, origin[1] + top
+            box = (x0, y0, x0 + glyph.width, y0 + glyph.height)
+            mask.paste(ImageChops.lighter(mask.crop(box), glyph), box)
+        return mask
+
+    def outlined_glyphs(self, text_color: str | tuple, outline_color: str | tuple, outline_width: int) -> dict[str, tuple[Image.Image, int, int] | None]:
+        """
+        描边后的字形 (每种颜色与描边宽度只生成一次)
+
+        :return: 字符 -> (描边覆盖的全部像素, 相对于笔位置的x, y)，空白字形为None
+        """
+        key = (text_color, outline_color, outline_width)
+        if key not in self._outlined:
+            with self._outlined_lock:
+                if key not in self._outlined:
+                    self._outlined[key] = {char: self._outline_glyph(char, *key) for char in self._glyphs}
+        return self._outlined[key]
+
+    def _outline_glyph(self, char: str, text_color: str | tuple, outline_color: str | tuple, outline_width: int) -> tuple[Image.Image, int, int] | None:
+        glyph, left, top = self._glyphs[char]
+        if glyph.width == 0:
+            return None
+        pad = 2 * outline_width
+        mask = Image.new('L', (glyph.width + 2 * pad, glyph.height + 2 * pad))
+        mask.paste(glyph, (pad, pad))
+        return outline_blend(mask, text_color, outline_color, outline_width), left - pad, top - pad
+
+
+@instrument
 class NumberGraphicsResources:
-    font: ImageFont.FreeTypeFont
-    upper_font: ImageFont.FreeTypeFont
+    fontpath: str
     size: int
     scale: int
     border: int
     margin: Margin
     max_height: int
-    upper: bool
-    number_height: int
     i18n: dict[str, str]
     color: str | tuple[int, int, int]
+    outline: str
+    # FreeType字体对象不是线程安全的，运行时的字体渲染需持有此锁 (字形图集的拼接不需要)
+    font_lock = threading.Lock()
+    # 字体、字形图集与数值高度探测均在首次使用时创建
+    _init_lock = threading.RLock()
+    # 进程级的文本遮罩缓存 (与颜色无关，不同颜色的同一文本共用): (文本, 字体, 大小, 起点) -> L图像
+    mask_cache = LRUCache(1024)
 
     @classmethod
     def static_init(cls, factory: ItemGraphicsFactory):
         fontpath: str = get_assets_path(factory.properties['coordinate']['font'])
         if not os.path.exists(fontpath):
             raise FileNotFoundError("Font file not found")
+        cls.fontpath = fontpath
         cls.size = factory.properties['coordinate']['font-size']
         cls.border = factory.properties['coordinate']['font-border-size']
-        cls.font = ImageFont.truetype(fontpath, cls.size - cls.border)
-        cls.upper_font = ImageFont.truetype(fontpath, cls.size - cls.border + 1)
         cls.scale = factory.properties['coordinate']['font-scale']
         margin: list[int] = factory.properties['coordinate']['font-margin']
         if len(margin) == 2:
@@ -62,13 +177,56 @@ class NumberGraphicsResources:
         if isinstance(color, str) and color.startswith('#'):
             color = tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
         cls.color = color
-        test_number = cls.create_number(8888, 'black')
-        cls.upper = bool(test_number.height % 2)
-        cls.number_height = test_number.height
+        cls.outline = factory.properties['coordinate'].get('font-outline', 'legacy')
+        if cls.outline not in ('legacy', 'stroke', 'dilate'):
+            raise ValueError(f"Invalid outline engine {cls.outline}")
         cls.i18n = get_i18n('text')
+        cls._fonts: dict[bool, ImageFont.FreeTypeFont] = {}
+        cls._atlases: dict[bool, GlyphAtlas] = {}
+        cls._probe = None
+
+    @classmethod
+    def get_font(cls, upper: bool = False) -> ImageFont.FreeTypeFont:
+        """
+        数值字体 (首次使用时加载)
+
+        :param upper: 是否为大一号的字体 (用于奇数高度的对齐)
+        """
+        if upper not in cls._fonts:
+            with cls._init_lock:
+                if upper not in cls._fonts:
+                    cls._fonts[upper] = ImageFont.truetype(cls.fontpath, cls.size - cls.border + int(upper))
+        return cls._fonts[upper]
 
+    @classmethod
+    def get_atlas(cls, upper: bool = False) -> GlyphAtlas:
+        """
+        数值字体的字形图集 (首次使用时创建)
+        """
+        if upper not in cls._atlases:
+            with cls._init_lock:
+                if upper not in cls._atlases:
+                    charset = '0123456789()-:' + cls.i18n['year'] + cls.i18n['month'] + cls.i18n['day']
+                    cls._atlases[upper] = GlyphAtlas(cls.get_font(upper), charset)
+        return cls._atlases[upper]
 
     @classmethod
+    def probe(cls) -> tuple[int, bool]:
+        """
+        以8888试绘制一次，得到数值图像的高度，以及是否需要大一号的字体 (高度为奇数时)
+
+        结果在首次调用后缓存
+        """
+        if cls._probe is None:
+            with cls._init_lock:
+                if cls._probe is None:
+                    test_number = cls.create_number(8888, 'black')
+                    cls._probe = (test_number.height, bool(test_number.height % 2))
+        return cls._probe
+
+
+    @classmethod
+    @profiled()
     def draw_text_with_outline(
         cls,
         text: str,
@@ -76,22 +234,194 @@ class NumberGraphicsResources:
         outline_color: str | tuple = 'black',
         outline_width: int = 1,
         *,
-        upper: bool = False
+        upper: bool = False,
+        engine: str | None = None
     ) -> Image.Image:
-        font = cls.upper_font if upper else cls.font
-        image = Image.new('RGBA', (font.size * len(text), 2 * font.size))
-        draw = ImageDraw.Draw(image)
-        # Draw outline by drawing text multiple times at different offsets
-        for dx in range(-outline_width, outline_width + 1):
-            for dy in range(-outline_width, outline_width + 1):
-                if dx != 0 or dy != 0:
-                    draw.text((2 * outline_width + dx, 2 * outline_width + dy), text, font=font, fill=outline_color)
-        # Draw the main text
-        draw.text((2 * outline_width, 2 * outline_width), text, font=font, fill=text_color)
+        """
+        绘制带描边的文本
+
+        :param engine: 描边引擎 (默认为 assets.coordinate.font-outline)
+        """
+        font = cls.get_font(upper)
+        atlas = cls.get_atlas(upper)
+        size = (font.size * len(text), 2 * font.size)
+        match engine or cls.outline:
+            case 'legacy':
+                image = cls._outline_legacy(text, font, atlas, size, text_color, outline_color, outline_width)
+            case 'stroke':
+                image = cls._outline_stroke(text, font, size, text_color, outline_color, outline_width)
+            case 'dilate':
+                image = cls._outline_dilate(text, font, atlas, size, text_color, outline_color, outline_width)
+            case _:
+                raise ValueError(f"Invalid outline engine {engine or cls.outline}")
         image = image.crop(image.getbbox())
         return image.resize((image.width * cls.scale, image.height * cls.scale), Image.Resampling.NEAREST)
 
     @classmethod
+    @profiled()
+    def _text_mask(
+        cls,
+        text: str,
+        font: ImageFont.FreeTypeFont,
+        atlas: GlyphAtlas,
+        size: tuple[int, int],
+        origin: tuple[int, int]
+    ) -> Image.Image:
+        """
+        文本的覆盖率遮罩 (优先使用字形图集，经过缓存，返回的图像为共享对象，不可修改)
+        """
+        return cls.mask_cache.get_or_create((text, font, size, origin), lambda: cls._render_mask(text, font, atlas, size, origin))
+
+    @classmethod
+    def _render_mask(
+        cls,
+        text: str,
+        font: ImageFont.FreeTypeFont,
+        atlas: GlyphAtlas,
+        size: tuple[int, int],
+        origin: tuple[int, int]
+    ) -> Image.Image:
+        if atlas.supports(text):
+            return atlas.render_mask(text, size, origin)
+        mask = Image.new('L', size)
+        with cls.font_lock:
+            ImageDraw.Draw(mask).text(origin, text, font=font, fill=255)
+        return mask
+
+    @classmethod
+    def _outline_legacy(
+        cls,
+        text: str,
+        font: ImageFont.FreeTypeFont,
+        atlas: GlyphAtlas,
+        size: tuple[int, int],
+        text_color: str | tuple,
+        outline_color: str | tuple,
+        outline_width: int
+    ) -> Image.Image:
+        """
+        逐偏移叠加(2·outline_width+1)²次遮罩的描边 (见outline_blend)
+
+        图集包含全部字形时，由预先描边的字形拼接，只在相邻字形的描边范围相交处按整串遮罩重新叠加
+        """
+        if atlas.supports(text):
+            return cls._outline_glyphs(text, font, atlas, size, text_color, outline_color, outline_width)
+        # 遮罩四周多留outline_width，使偏移后的粘贴与逐次绘制的裁剪范围一致
+        mask = cls._text_mask(
+            text, font, atlas,
+            (size[0] + 2 * outline_width, size[1] + 2 * outline_width),
+            (3 * outline_width, 3 * outline_width)
+        )
+        bbox = mask.getbbox()
+        if bbox is None:
+            return Image.new('RGBA', size)
+        # 只在描边可能覆盖的区域内叠加 (其余像素在逐次绘制中同样为空)
+        left = max(bbox[0] - 2 * outline_width, 0)
+        top = max(bbox[1] - 2 * outline_width, 0)
+        right, bottom = min(bbox[2], size[0]), min(bbox[3], size[1])
+        return outline_blend(mask.crop((left, top, right + 2 * outline_width, bottom + 2 * outline_width)), text_color, outline_color, outline_width)
+
+    @classmethod
+    @profiled()
+    def _outline_glyphs(
+        cls,
+        text: str,
+        font: ImageFont.FreeTypeFont,
+        atlas: GlyphAtlas,
+        size: tuple[int, int],
+        text_color: str | tuple,
+        outline_color: str | tuple,
+        outline_width: int
+    ) -> Image.Image:
+        """
+        由预先描边的字形拼接描边文本 (与_outline_legacy逐像素一致)
+
+        只被一个字形的描边范围覆盖的像素与该字形单独描边的结果相同；
+        多个字形的描边范围相交的矩形内按整串遮罩重新叠加
+        """
+        glyphs = atlas.outlined_glyphs(text_color, outline_color, outline_width)
+        # 与_outline_legacy的遮罩相同: 文本起点为(3·outline_width, 3·outline_width)，画布像素对应以其为左上角的遮罩窗口
+        origin = 3 * outline_width
+        image = Image.new('RGBA', size)
+        rects: list[tuple[int, int, int, int]] = []
+        for char, x in zip(text, atlas.offsets(text)):
+            outlined = glyphs[char]
+            if outlined is None:
+                continue
+            tile, left, top = outlined
+            x0, y0 = origin + int(x) + left, origin + top
+            image.paste(tile, (x0, y0))
+            rects.append((x0, y0, x0 + tile.width, y0 + tile.height))
+        overlaps = [
+            overlap for i, a in enumerate(rects) for b in rects[i + 1:]
+            if (overlap := (max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])))[0] < overlap[2] and overlap[1] < overlap[3]
+        ]
+        if overlaps:
+            mask = cls._text_mask(
+                text, font, atlas,
+                (size[0] + 2 * outline_width, size[1] + 2 * outline_width),
+                (origin, origin)
+            )
+            for x0, y0, x1, y1 in overlaps:
+                window = mask.crop((x0, y0, x1 + 2 * outline_width, y1 + 2 * outline_width))
+                image.paste(outline_blend(window, text_color, outline_color, outline_width), (x0, y0))
+        return image
+
+    @classmethod
+    def _outline_stroke(
+        cls,
+        text: str,
+        font: ImageFont.FreeTypeFont,
+        size: tuple[int, int],
+        text_color: str | tuple,
+        outline_color: str | tuple,
+        outline_width: int
+    ) -> Image.Image:
+        """
+        使用Pillow原生stroke_width的单次描边 (圆角描边)
+        """
+        image = Image.new('RGBA', size)
+        with cls.font_lock:
+            ImageDraw.Draw(image).text(
+                (2 * outline_width, 2 * outline_width), text,
+                font=font, fill=text_color,
+                stroke_width=outline_width, stroke_fill=outline_color
+            )
+        return image
+
+    @classmethod
+    def _outline_dilate(
+        cls,
+        text: str,
+        font: ImageFont.FreeTypeFont,
+        atlas: GlyphAtlas,
+        size: tuple[int, int],
+        text_color: str | tuple,
+        outline_color: str | tuple,
+        outline_width: int
+    ) -> Image.Image:
+        """
+        对遮罩做(2·outline_width+1)方形核的膨胀得到描边 (与偏移网格同形)
+        """
+        image = Image.new('RGBA', size)
+        mask = cls._text_mask(
+            text, font, atlas,
+            (size[0] + 2 * outline_width, size[1] + 2 * outline_width),
+            (3 * outline_width, 3 * outline_width)
+        )
+        bbox = mask.getbbox()
+        if bbox is None:
+            return image
+        # 只对文本所在区域(外扩outline_width)做膨胀
+        region = (bbox[0] - outline_width, bbox[1] - outline_width, bbox[2] + outline_width, bbox[3] + outline_width)
+        mask = mask.crop(region)
+        box = (region[0] - outline_width, region[1] - outline_width, region[2] - outline_width, region[3] - outline_width)
+        image.paste(outline_color, box, mask.filter(ImageFilter.MaxFilter(2 * outline_width + 1)))
+        image.paste(text_color, box, mask)
+        return image
+
+    @classmethod
+    @profiled()
     def create_number(
         cls,
         number: int,
@@ -128,6 +458,7 @@ class NumberGraphicsResources:
         return image
 
     @classmethod
+    @profiled()
     def create_datetime(
         cls,
         timestamp: int | datetime.datetime,
@@ -158,3 +489,6 @@ class NumberGraphicsResources:
             new_image.paste(image, ((width - image.width) // 2, (height - image.height) // 2))
             image = new_image
         return image
+
+
+Profiler.add_source('text_masks', NumberGraphicsResources.mask_cache.info)
@@ -0,0 +1,315 @@
+from typing import Any, Callable, NamedTuple
+from PIL import Image
+import tracemalloc
+import functools
+import threading
+import json
+import time
+
+
+PROFILE_ATTRIBUTE = '__profile_name__'
+
+
+class Sample(NamedTuple):
+    """
+    一次被测调用的结果 (传给钩子)
+
+    :param name: 阶段名称
+    :param seconds: 墙钟耗时 (包含内部被测调用)
+    :param images: 调用期间Pillow核心创建的图像数
+    :param allocated: 调用期间Python分配内存的峰值增量 (字节，未开启内存跟踪时为None)
+    """
+    name: str
+    seconds: float
+    images: int
+    allocated: int | None
+
+
+class StageStats:
+    """
+    单个阶段的累计统计
+    """
+    __slots__ = ('calls', 'seconds', 'max', 'images', 'allocated')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max = 0.0
+        self.images = 0
+        self.allocated: int | None = None
+
+    def add(self, sample: Sample) -> None:
+        self.calls += 1
+        self.seconds += sample.seconds
+        self.max = max(self.max, sample.seconds)
+        self.images += sample.images
+        if sample.allocated is not None:
+            self.allocated = max(self.allocated or 0, sample.allocated)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "seconds": self.seconds,
+            "mean": self.seconds / self.calls if self.calls else 0.0,
+            "max": self.max,
+            "images": self.images,
+            "allocated": self.allocated,
+        }
+
+
+def profiled(name: str | None = None):
+    """
+    标记需要测量的函数 (不包装，未开启时没有任何开销)
+
+    应放在@property/@classmethod/@staticmethod之下，所在的类或模块需要经过instrument注册
+
+    :param name: 阶段名称 (默认为方法的 类名.方法名，或函数的 模块名.函数名)
+    """
+    def decorator(func: Callable) -> Callable:
+        default = func.__qualname__ if '.' in func.__qualname__ else f"{func.__module__.rpartition('.')[2]}.{func.__qualname__}"
+        setattr(func, PROFILE_ATTRIBUTE, name or default)
+        return func
+    return decorator
+
+
+def _marked(value: Any) -> tuple[Callable, Callable[[Callable], Any]] | None:
+    """
+    被标记的属性及其重新包装的方式 (未标记时为None)
+    """
+    if isinstance(value, property) and hasattr(value.fget, PROFILE_ATTRIBUTE):
+        return value.fget, lambda fget: property(fget, value.fset, value.fdel, value.__doc__)
+    if isinstance(value, (classmethod, staticmethod)) and hasattr(value.__func__, PROFILE_ATTRIBUTE):
+        return value.__func__, type(value)
+    if callable(value) and hasattr(value, PROFILE_ATTRIBUTE):
+        return value, lambda func: func
+    return None
+
+
+class Profiler:
+    """
+    阶段分析器 (进程级)
+
+    开启时把instrument注册的被标记函数替换为测量包装，关闭时换回原函数，因此关闭状态下没有任何额外开销；
+    记录每个阶段的调用次数、墙钟耗时、创建的Pillow图像数，开启内存跟踪时还记录Python分配内存的峰值增量
+    (tracemalloc会明显拖慢Python代码，且不包含Pillow图像本身的像素内存)
+
+    耗时为包含内部被测调用的总耗时；多线程并行渲染时各线程的耗时累加，可能超过墙钟时间
+    """
+    enabled = False
+    memory = False
+    _lock = threading.Lock()
+    _local = threading.local()
+    _patches: list[tuple[Any, str, Any, Any]] = []
+    _hooks: list[Callable[[Sample], None]] = []
+    _sources: dict[str, Callable[[], dict]] = {}
+    _stats: dict[str, StageStats] = {}
+    _baseline: dict[str, Any] = {}
+    _started = 0.0
+    _tracing = False
+
+    @classmethod
+    def instrument(cls, target):
+        """
+        注册类或模块中被标记的函数 (可作为类装饰器)，已开启时立即生效
+        """
+        registered = {(id(patch[0]), patch[1]) for patch in cls._patches}
+        for attribute, value in list(vars(target).items()):
+            marked = _marked(value)
+            if marked is None or (id(target), attribute) in registered:
+                continue
+            func, rewrap = marked
+            replacement = rewrap(cls._wrap(getattr(func, PROFILE_ATTRIBUTE), func))
+            with cls._lock:
+                cls._patches.append((target, attribute, value, replacement))
+            if cls.enabled:
+                setattr(target, attribute, replacement)
+        return target
+
+    @classmethod
+    def _wrap(cls, name: str, func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = cls._enter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                cls._exit(name, token)
+        return wrapper
+
+    @classmethod
+    def _enter(cls) -> tuple[float, int]:
+        if cls.memory and tracemalloc.is_tracing():
+            # 嵌套调用时先把当前峰值合并到外层，再重置峰值
+            stack = cls._stack()
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            stack.append([current, current])
+        return time.perf_counter(), Image.core.get_stats()['new_count']
+
+    @classmethod
+    def _exit(cls, name: str, token: tuple[float, int]) -> None:
+        seconds = time.perf_counter() - token[0]
+        images = Image.core.get_stats()['new_count'] - token[1]
+        allocated = None
+        if cls.memory and tracemalloc.is_tracing():
+            stack = cls._stack()
+            if stack:
+                start, peak = stack.pop()
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                allocated = peak - start
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], peak)
+                tracemalloc.reset_peak()
+        sample = Sample(name, seconds, images, allocated)
+        with cls._lock:
+            stats = cls._stats.get(name)
+            if stats is None:
+                stats = cls._stats[name] = StageStats()
+            stats.add(sample)
+        for hook in cls._hooks:
+            hook(sample)
+
+    @classmethod
+    def _stack(cls) -> list[list[int]]:
+        if getattr(cls._local, "stack", None) is None:
+            cls._local.stack = []
+        return cls._local.stack
+
+    @classmethod
+    def enable(cls, memory: bool = False) -> None:
+        """
+        开启测量 (清空之前的统计)
+
+        :param memory: 同时用tracemalloc跟踪Python内存分配
+        """
+        with cls._lock:
+            cls._stats = {}
+            cls._baseline = cls._snapshot()
+            cls._started = time.perf_counter()
+            cls.memory = memory
+            if memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                cls._tracing = True
+            if not cls.enabled:
+                for target, attribute, _, replacement in cls._patches:
+                    setattr(target, attribute, replacement)
+            cls.enabled = True
+
+    @classmethod
+    def disable(cls) -> None:
+        """
+        关闭测量并换回原函数 (统计保留，仍可report)
+        """
+        with cls._lock:
+            if cls.enabled:
+                for target, attribute, original, _ in cls._patches:
+                    setattr(target, attribute, original)
+            # 只停止由enable开启的跟踪
+            if cls._tracing:
+                tracemalloc.stop()
+                cls._tracing = False
+            cls.enabled = False
+
+    @classmethod
+    def add_hook(cls, hook: Callable[[Sample], None]) -> None:
+        """
+        添加钩子，每次被测调用结束时以Sample调用 (在被测线程中同步调用，应尽量轻量)
+        """
+        cls._hooks.append(hook)
+
+    @classmethod
+    def remove_hook(cls, hook: Callable[[Sample], None]) -> None:
+        cls._hooks.remove(hook)
+
+    @classmethod
+    def add_source(cls, name: str, source: Callable[[], dict]) -> None:
+        """
+        添加缓存统计的来源 (返回含hits/misses的字典，可嵌套)，报告中给出开启以来的命中次数与命中率
+        """
+        cls._sources[name] = source
+
+    @classmethod
+    def _snapshot(cls) -> dict[str, Any]:
+        return {name: source() for name, source in cls._sources.items()}
+
+    @staticmethod
+    def _hit_rates(now: dict, before: dict | None) -> dict:
+        """
+        与开启时的统计相减，并计算命中率
+        """
+        before = before or {}
+        if 'hits' in now and 'misses' in now:
+            hits = now['hits'] - before.get('hits', 0)
+            misses = now['misses'] - before.get('misses', 0)
+            return {
+                **now,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else None,
+            }
+        return {
+            key: Profiler._hit_rates(value, before.get(key)) if isinstance(value, dict) else value
+            for key, value in now.items()
+        }
+
+    @classmethod
+    def report(cls) -> dict[str, Any]:
+        """
+        统计报告 (按总耗时降序)
+        """
+        with cls._lock:
+            stages = sorted(cls._stats.items(), key=lambda item: item[1].seconds, reverse=True)
+            baseline = cls._baseline
+        snapshot = cls._snapshot()
+        return {
+            "seconds": time.perf_counter() - cls._started if cls._started else 0.0,
+            "memory": cls.memory,
+            "stages": {name: stats.to_dict() for name, stats in stages},
+            "caches": {name: cls._hit_rates(value, baseline.get(name)) for name, value in snapshot.items()},
+        }
+
+    @classmethod
+    def dump(cls, path: str) -> None:
+        """
+        将统计报告写入JSON文件
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(cls.report(), f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def stage(cls, name: str) -> '_Stage':
+        """
+        测量一段代码 (with语句)，未开启时只做一次判断
+        """
+        return _Stage(cls, name)
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'token')
+
+    def __init__(self, profiler: type[Profiler], name: str):
+        self.profiler = profiler
+        self.name = name
+        self.token = None
+
+    def __enter__(self):
+        if self.profiler.enabled:
+            self.token = self.profiler._enter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.token is not None:
+            self.profiler._exit(self.name, self.token)
+            self.token = None
+
+
+def instrument(target):
+    """
+    Profiler.instrument 的简写，可作为类装饰器或以模块对象调用
+    """
+    return Profiler.instrument(target)
+
+
+__all__ = ["Profiler", "Sample", "StageStats", "profiled", "instrument"]
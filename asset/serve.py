@@ -0,0 +1,373 @@
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterable, Sequence
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import bisect
+import threading
+import json
+import time
+import io
+
+import asset
+from asset.batch import ARTIFACTS, render_series
+from asset.cache import RenderCache
+from asset.candle import Candle, CandleSeries
+from asset.candle._timestamp import InvalidTimestampError, parse_timestamps
+from asset.encoding import PRESETS, get_options
+
+
+# 延迟直方图的桶上限 (秒)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'webp': 'image/webp',
+}
+
+# 预热用的最小序列 (加载字体、字形图集与精灵图)
+WARMUP_ROWS = (
+    (946684800, 100, 120, 90, 110),
+    (946771200, 110, 115, 95, 100),
+)
+
+
+class Histogram:
+    """
+    累积直方图 (Prometheus格式)
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def render(self, name: str, help: str) -> list[str]:
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        lines = [f'# HELP {name} {help}', f'# TYPE {name} histogram']
+        cumulative = 0
+        for bound, bucket in zip(self.buckets, counts):
+            cumulative += bucket
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {count}')
+        lines.append(f'{name}_sum {total}')
+        lines.append(f'{name}_count {count}')
+        return lines
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class RenderService:
+    """
+    常驻的渲染服务: 资源只初始化一次，渲染在有界的线程池中执行
+
+    同时进行(执行中+排队)的渲染数不超过 workers + queue_size，超出时立即拒绝；
+    等待超过timeout的请求返回超时 (仍在排队的渲染被取消，已开始的渲染会继续完成并写入缓存)
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        queue_size: int = 16,
+        timeout: float = 30.0,
+        cache: RenderCache | None = None,
+        warmup: bool = True
+    ):
+        """
+        :param workers: 渲染线程数
+        :param queue_size: 最多排队的渲染数
+        :param timeout: 单个请求的最长等待时间 (秒，包含排队)
+        :param cache: 磁盘渲染缓存
+        :param warmup: 启动时渲染一次最小序列
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        self.request_seconds = Histogram()
+        self.queue_seconds = Histogram()
+        self.render_seconds = Histogram()
+        self.responses: dict[int, int] = {}
+        self.queued = 0
+        self.running = 0
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self.factory = asset.asset_init()
+        if warmup:
+            render_series(CandleSeries.from_rows(WARMUP_ROWS), {'merged': PRESETS['default']})
+
+    def _run(self, series: CandleSeries, artifact: str, options, submitted: float) -> bytes:
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        started = time.perf_counter()
+        self.queue_seconds.observe(started - submitted)
+        try:
+            return render_series(series, {artifact: options}, self.cache)[artifact]
+        finally:
+            self.render_seconds.observe(time.perf_counter() - started)
+            with self._lock:
+                self.running -= 1
+            self._slots.release()
+
+    def submit(self, series: CandleSeries, artifact: str = 'merged', options=None) -> Future:
+        """
+        提交渲染，队列已满时抛出QueueFullError
+        """
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError(f"Render queue is full ({self.workers} running, {self.queue_size} queued)")
+        with self._lock:
+            self.queued += 1
+        try:
+            return self.executor.submit(self._run, series, artifact, get_options(options), time.perf_counter())
+        except BaseException:
+            with self._lock:
+                self.queued -= 1
+            self._slots.release()
+            raise
+
+    def render(self, series: CandleSeries, artifact: str = 'merged', options=None) -> bytes:
+        """
+        渲染并等待结果，超时抛出TimeoutError
+        """
+        future = self.submit(series, artifact, options)
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                # 未开始的渲染不会执行_run，在此归还名额
+                with self._lock:
+                    self.queued -= 1
+                self._slots.release()
+            raise TimeoutError(f"Render timed out after {self.timeout}s")
+
+    def record(self, status: int, seconds: float) -> None:
+        self.request_seconds.observe(seconds)
+        with self._lock:
+            self.responses[status] = self.responses.get(status, 0) + 1
+
+    def metrics(self) -> str:
+        """
+        Prometheus文本格式的指标
+        """
+        with self._lock:
+            queued, running, responses = self.queued, self.running, dict(self.responses)
+        lines = [
+            '# HELP kline_queue_depth Renders waiting for a worker',
+            '# TYPE kline_queue_depth gauge',
+            f'kline_queue_depth {queued}',
+            '# HELP kline_renders_in_flight Renders currently running',
+            '# TYPE kline_renders_in_flight gauge',
+            f'kline_renders_in_flight {running}',
+            '# HELP kline_workers Size of the render pool',
+            '# TYPE kline_workers gauge',
+            f'kline_workers {self.workers}',
+            '# HELP kline_responses_total Responses by status code',
+            '# TYPE kline_responses_total counter',
+            *(f'kline_responses_total{{code="{code}"}} {count}' for code, count in sorted(responses.items())),
+        ]
+        lines += self.request_seconds.render('kline_request_seconds', 'Request latency including queueing')
+        lines += self.queue_seconds.render('kline_queue_seconds', 'Time spent waiting for a worker')
+        lines += self.render_seconds.render('kline_render_seconds', 'Render and encode time')
+        if self.cache is not None:
+            lines += [
+                '# HELP kline_cache_hits_total Render cache hits',
+                '# TYPE kline_cache_hits_total counter',
+                f'kline_cache_hits_total {self.cache.hits}',
+                '# HELP kline_cache_misses_total Render cache misses',
+                '# TYPE kline_cache_misses_total counter',
+                f'kline_cache_misses_total {self.cache.misses}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def parse_json(payload: Any) -> CandleSeries:
+    """
+    JSON格式的K线数据: 对象列表 {timestamp, open, high, low, close}、
+    [timestamp, open, high, low, close] 列表，或包含上述列表的 {"candles": [...]}
+
+    时间戳为整数时直接使用，为字符串时与CSV一样自动检测格式
+    """
+    if isinstance(payload, dict):
+        payload = payload.get('candles')
+    if not isinstance(payload, list):
+        raise ValueError("Expected a list of candles")
+    rows: list[Sequence[Any]] = []
+    for item in payload:
+        if isinstance(item, dict):
+            item = [item.get(name) for name in CandleSeries.COLUMNS]
+        if not isinstance(item, list) or len(item) != len(CandleSeries.COLUMNS):
+            raise ValueError(f"Invalid candle: {item!r}")
+        rows.append(item)
+    timestamps: Iterable[Any] = [row[0] for row in rows]
+    if any(isinstance(timestamp, str) for timestamp in timestamps):
+        try:
+            timestamps = parse_timestamps([str(timestamp) for timestamp in timestamps])
+        except InvalidTimestampError as e:
+            raise ValueError(f"Invalid candle: {rows[e.index]!r}") from e
+    return CandleSeries.from_candles(
+        Candle(timestamp=timestamp, open=row[1], high=row[2], low=row[3], close=row[4])
+        for timestamp, row in zip(timestamps, rows)
+    )
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    """
+    - GET /health: 存活检查
+    - GET /metrics: Prometheus文本格式的指标
+    - POST /render[/<artifact>][?format=<preset>]: 请求体为CSV(text/csv)或JSON(application/json)，返回编码后的图像
+    """
+    server: 'RenderServer'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format: str, *args) -> None:
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, body: bytes, content_type: str = 'text/plain; charset=utf-8') -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send(status, json.dumps({"error": message}, ensure_ascii=False).encode(), 'application/json')
+
+    def do_GET(self) -> None:
+        path = urlsplit(self.path).path
+        if path == '/health':
+            self._send(200, b'ok\n')
+        elif path == '/metrics':
+            self._send(200, self.server.service.metrics().encode(), 'text/plain; version=0.0.4; charset=utf-8')
+        else:
+            self._error(404, f"Not found: {path}")
+
+    def do_POST(self) -> None:
+        started = time.perf_counter()
+        status = self._render()
+        self.server.service.record(status, time.perf_counter() - started)
+
+    def _render(self) -> int:
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+        if parts[0] != 'render' or len(parts) > 2:
+            self._error(404, f"Not found: {url.path}")
+            return 404
+        artifact = parts[1] if len(parts) == 2 else 'merged'
+        if artifact not in ARTIFACTS:
+            self._error(404, f"Invalid artifact: {artifact} (expected one of {', '.join(ARTIFACTS)})")
+            return 404
+        query = parse_qs(url.query)
+        try:
+            options = get_options(query.get('format', ['default'])[0])
+        except ValueError as e:
+            self._error(400, str(e))
+            return 400
+        # 请求体的长度无法确定时无法读取后续请求，关闭连接
+        header = self.headers.get('Content-Length')
+        if header is None:
+            self._error(411, "Content-Length required")
+            self.close_connection = True
+            return 411
+        try:
+            length = int(header)
+            if length < 0:
+                raise ValueError
+        except ValueError:
+            self._error(400, f"Invalid Content-Length: {header}")
+            self.close_connection = True
+            return 400
+        if length > self.server.max_body:
+            self._error(413, f"Payload exceeds {self.server.max_body} bytes")
+            self.close_connection = True
+            return 413
+        body = self.rfile.read(length)
+        content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+        try:
+            text = body.decode('utf-8-sig')
+            if content_type == 'application/json' or (not content_type.startswith('text/') and text.lstrip().startswith(('[', '{'))):
+                series = parse_json(json.loads(text))
+            else:
+                series = CandleSeries.from_csv(io.StringIO(text))
+            if not len(series):
+                raise ValueError("No candles")
+            data = self.server.service.render(series, artifact, options)
+        except QueueFullError as e:
+            self._error(503, str(e))
+            return 503
+        except TimeoutError as e:
+            self._error(504, str(e))
+            return 504
+        except (ValueError, UnicodeDecodeError) as e:
+            self._error(400, str(e))
+            return 400
+        except Exception as e:
+            self._error(500, f"{type(e).__name__}: {e}")
+            return 500
+        self._send(200, data, CONTENT_TYPES[options.format])
+        return 200
+
+
+class RenderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: RenderService, max_body: int = 8 * 1024 * 1024, quiet: bool = False):
+        """
+        :param address: 监听地址 (默认只监听本机)
+        :param service: 渲染服务
+        :param max_body: 请求体的最大字节数
+        :param quiet: 不输出访问日志
+        """
+        self.service = service
+        self.max_body = max_body
+        self.quiet = quiet
+        super().__init__(address, RenderHandler)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m asset.serve', description='本地K线渲染服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址 (默认只监听本机)')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口 (0为随机端口)')
+    parser.add_argument('-w', '--workers', type=int, default=2, help='渲染线程数')
+    parser.add_argument('--queue', type=int, default=16, help='最多排队的渲染数 (超出时返回503)')
+    parser.add_argument('--timeout', type=float, default=30.0, help='单个请求的最长等待时间 (秒，超出时返回504)')
+    parser.add_argument('--max-body', type=int, default=8 * 1024 * 1024, help='请求体的最大字节数')
+    parser.add_argument('--cache-dir', metavar='DIR', default=None, help='磁盘渲染缓存目录 (默认不使用)')
+    parser.add_argument('--quiet', action='store_true', help='不输出访问日志')
+    args = parser.parse_args(argv)
+
+    service = RenderService(
+        workers=args.workers,
+        queue_size=args.queue,
+        timeout=args.timeout,
+        cache=RenderCache(args.cache_dir) if args.cache_dir else None
+    )
+    server = RenderServer((args.host, args.port), service, args.max_body, args.quiet)
+    print(f'Serving on http://{server.server_address[0]}:{server.server_address[1]}', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -23,6 +23,9 @@ def get_executable_directory(path: str | None = None):
         # Python Direct
         entry_script_path = os.path.abspath(sys.argv[0])
         application_path = os.path.dirname(entry_script_path)
+        if application_path == os.path.dirname(os.path.abspath(__file__)):
+            # python -m asset.xxx: 入口在包内，程序目录为包的上一级
+            application_path = os.path.dirname(application_path)
     if path:
         return os.path.join(application_path, path)
     return application_path
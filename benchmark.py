@@ -0,0 +1,317 @@
+import argparse
+import datetime
+import platform
+import tempfile
+import tracemalloc
+import json
+import time
+import gc
+import os
+import sys
+
+import PIL
+from PIL import Image
+
+import asset
+from asset.candle import CandleGroup, CandleSeries, CandleGraphicsResources
+from asset.candle._backend import array_cache
+from asset.encoding import encode_all
+from asset.number import NumberGraphicsResources
+from graphics import ArrayGraphics, CommonGraphics
+from genkline import generate_candles, write_csv
+
+try:
+    import resource
+except ImportError: # Windows没有resource模块，峰值常驻内存记为None
+    resource = None
+
+
+# 阶段名称与所属层级: data只处理数据，sprite逐根绘制子图像，canvas生成与序列等宽的整幅图像
+STAGES = (
+    ('parse', 'data'),
+    ('check_error', 'data'),
+    ('candles', 'sprite'),
+    ('numbers', 'sprite'),
+    ('horizontal', 'sprite'),
+    ('vertical', 'canvas'),
+    ('composite', 'canvas'),
+    ('encode', 'canvas'),
+)
+
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+
+WARMUP_SIZE = 10
+
+
+class Pipeline:
+    """
+    单个CSV文件的渲染流程，按STAGES的顺序逐个调用阶段方法
+    """
+
+    def __init__(self, csv_file: str, jobs: int | None = None):
+        self.csv_file = csv_file
+        self.jobs = jobs
+
+    def parse(self):
+        self.series = CandleSeries.from_csv(self.csv_file)
+
+    def check_error(self):
+        self.group = CandleGroup(series=self.series, jobs=self.jobs)
+        self.group.check_error()
+
+    def candles(self):
+        self.group._gen_klines()
+
+    def numbers(self):
+        self.group.number_images
+
+    def horizontal(self):
+        self.group.horizontal
+
+    def vertical(self):
+        self.group.coordinate
+
+    def composite(self):
+        self.images = {name: self.group.artifact(name) for name in CandleGroup.ARTIFACTS}
+
+    def encode(self):
+        self.encoded = encode_all(self.images)
+
+
+def clear_caches():
+    """
+    清空进程内的精灵图缓存，使每次运行都是冷渲染 (字体与字形图集保持预热)
+    """
+    CandleGraphicsResources.candle_cache.clear()
+    CommonGraphics.cache.clear()
+    array_cache.clear()
+    ArrayGraphics._instances.clear()
+    NumberGraphicsResources.mask_cache.clear()
+    gc.collect()
+
+
+def reset_peak_rss() -> bool:
+    """
+    重置进程的峰值常驻内存 (仅Linux支持，其它平台只能得到整个进程的峰值)
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss() -> int | None:
+    """
+    峰值常驻内存 (字节)
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def pillow_images() -> int:
+    """
+    Pillow核心已创建的图像数 (每次Image.new/crop/resize/paste的临时图像等)
+    """
+    return Image.core.get_stats()['new_count']
+
+
+def stages_for(count: int, sprite_limit: int, canvas_limit: int) -> list[str]:
+    limits = {'data': None, 'sprite': sprite_limit, 'canvas': canvas_limit}
+    return [name for name, tier in STAGES if limits[tier] is None or count <= limits[tier]]
+
+
+def run_once(csv_file: str, stages: list[str], jobs: int | None, memory: bool) -> dict[str, dict]:
+    """
+    运行一次完整流程，记录每个阶段的耗时与创建的Pillow图像数
+
+    :param memory: 同时记录每个阶段的峰值常驻内存与tracemalloc峰值 (tracemalloc会拖慢Python代码，耗时不可用)
+    """
+    clear_caches()
+    pipeline = Pipeline(csv_file, jobs)
+    results: dict[str, dict] = {}
+    for stage in stages:
+        record: dict = {}
+        if memory:
+            record['rss_reset'] = reset_peak_rss()
+            tracemalloc.reset_peak()
+        images = pillow_images()
+        start = time.perf_counter()
+        getattr(pipeline, stage)()
+        record['seconds'] = time.perf_counter() - start
+        record['images'] = pillow_images() - images
+        if memory:
+            record['rss_peak'] = peak_rss()
+            record['traced_peak'] = tracemalloc.get_traced_memory()[1]
+        results[stage] = record
+    return results
+
+
+def run(args) -> dict:
+    sizes = [int(size) for size in args.sizes.split(',')]
+    report: dict = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "params": {
+                "seed": args.seed,
+                "start": args.start,
+                "volatility": args.volatility,
+                "wick": args.wick,
+                "floor": args.floor,
+                "ceiling": args.ceiling,
+                "repeat": args.repeat,
+                "jobs": args.jobs,
+                "sprite_limit": args.sprite_limit,
+                "canvas_limit": args.canvas_limit,
+                "backend": CandleGraphicsResources.backend,
+            },
+        },
+        "results": {},
+    }
+    def write(count: int) -> str:
+        csv_file = os.path.join(folder, f'{count}.csv')
+        write_csv(generate_candles(
+            count,
+            seed=args.seed,
+            start=args.start,
+            volatility=args.volatility,
+            wick=args.wick,
+            floor=args.floor,
+            ceiling=args.ceiling,
+            # 日K从2000年起，结果与运行日期无关
+            end=datetime.datetime(2000, 1, 1) + datetime.timedelta(days=count - 1)
+        ), csv_file)
+        return csv_file
+
+    with tempfile.TemporaryDirectory(prefix='kline-bench-') as folder:
+        # 预热字体、字形图集等不随clear_caches清空的资源，使各规模的首次运行与之后一致
+        run_once(write(WARMUP_SIZE), [name for name, _ in STAGES], args.jobs, False)
+        for count in sizes:
+            csv_file = write(count)
+            stages = stages_for(count, args.sprite_limit, args.canvas_limit)
+            runs = [run_once(csv_file, stages, args.jobs, False) for _ in range(args.repeat)]
+            result = {
+                stage: {
+                    "seconds": min(r[stage]['seconds'] for r in runs),
+                    "mean": sum(r[stage]['seconds'] for r in runs) / len(runs),
+                    "images": runs[-1][stage]['images'],
+                }
+                for stage in stages
+            }
+            if args.memory:
+                tracemalloc.start()
+                try:
+                    traced = run_once(csv_file, stages, args.jobs, True)
+                finally:
+                    tracemalloc.stop()
+                for stage in stages:
+                    result[stage]['rss_peak'] = traced[stage]['rss_peak'] if traced[stage]['rss_reset'] else None
+                    result[stage]['traced_peak'] = traced[stage]['traced_peak']
+            result['total'] = {"seconds": sum(result[stage]['seconds'] for stage in stages)}
+            report['results'][str(count)] = result
+            print_size(count, result)
+            gc.collect()
+    return report
+
+
+def print_size(count: int, result: dict):
+    print(f'{count} candles')
+    for stage, record in result.items():
+        line = f'  {stage:<12}{record["seconds"] * 1000:>12.2f} ms'
+        if 'images' in record:
+            line += f'{record["images"]:>10} images'
+        if record.get('traced_peak') is not None:
+            line += f'{record["traced_peak"] / 1048576:>10.1f} MB traced'
+        if record.get('rss_peak') is not None:
+            line += f'{record["rss_peak"] / 1048576:>10.1f} MB rss'
+        print(line)
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_delta: float) -> list[str]:
+    """
+    与基线逐个比较同一规模同一阶段的结果，返回回归的描述
+
+    耗时超过基线的(1+threshold)倍且绝对差值超过min_delta秒、tracemalloc峰值超过基线的(1+threshold)倍、
+    或创建的Pillow图像数增加时视为回归 (峰值常驻内存受其它阶段影响，只显示不判定)
+    """
+    regressions: list[str] = []
+    for size, stages in current['results'].items():
+        base_stages = baseline['results'].get(size)
+        if base_stages is None:
+            continue
+        for stage, record in stages.items():
+            base = base_stages.get(stage)
+            if base is None:
+                continue
+            now, before = record['seconds'], base['seconds']
+            ratio = now / before if before else float('inf')
+            mark = ''
+            if now > before * (1 + threshold) and now - before > min_delta:
+                mark = ' REGRESSION'
+                regressions.append(f'{size}/{stage}: {before * 1000:.2f} -> {now * 1000:.2f} ms ({ratio:.2f}x)')
+            print(f'{size:>7} {stage:<12}{before * 1000:>12.2f} ->{now * 1000:>12.2f} ms {ratio:>7.2f}x{mark}')
+            if base.get('traced_peak') and record.get('traced_peak') and record['traced_peak'] > base['traced_peak'] * (1 + threshold):
+                regressions.append(f'{size}/{stage}: traced peak {base["traced_peak"]} -> {record["traced_peak"]} bytes')
+            if 'images' in base and 'images' in record and record['images'] > base['images']:
+                regressions.append(f'{size}/{stage}: pillow images {base["images"]} -> {record["images"]}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='K线渲染各阶段的基准测试')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='K线数量 (逗号分隔)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--start', type=int, default=7500, help='初始分数')
+    parser.add_argument('--volatility', type=int, default=40, help='每根K线开收盘的最大变化')
+    parser.add_argument('--wick', type=int, default=20, help='上下影线的最大长度')
+    parser.add_argument('--floor', type=int, default=7000, help='分数下限')
+    parser.add_argument('--ceiling', type=int, default=8000, help='分数上限 (决定图像高度)')
+    parser.add_argument('--repeat', type=int, default=3, help='每个规模运行的次数 (取最小耗时)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='并行渲染的线程数')
+    parser.add_argument('--sprite-limit', type=int, default=1000, help='逐根绘制的阶段只在不超过此数量时运行')
+    parser.add_argument('--canvas-limit', type=int, default=100, help='生成整幅图像的阶段只在不超过此数量时运行')
+    parser.add_argument('--backend', choices=CandleGraphicsResources.BACKENDS, default=None, help='K线层的绘制后端 (默认为 assets.candlestick.backend)')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='不额外运行一次以记录内存')
+    parser.add_argument('-o', '--output', default=None, help='结果JSON文件')
+    parser.add_argument('--input', default=None, help='不运行，直接读取已有的结果JSON (用于比较)')
+    parser.add_argument('--compare', metavar='BASELINE', default=None, help='与基线结果JSON比较，有回归时退出码为1')
+    parser.add_argument('--threshold', type=float, default=0.1, help='判定回归的相对阈值')
+    parser.add_argument('--min-delta', type=float, default=0.002, help='判定耗时回归的最小绝对差值 (秒)')
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, encoding='utf-8') as f:
+            report = json.load(f)
+    else:
+        asset.asset_init()
+        if args.backend is not None:
+            CandleGraphicsResources.backend = args.backend
+        report = run(args)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold, args.min_delta)
+        if regressions:
+            print('\n'.join(['', 'Regressions:', *regressions]))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,28 +1,84 @@
-import random
+import argparse
 import datetime
+import random
 import csv
 
 
-today = datetime.datetime.combine(datetime.date.today(), datetime.time.min)
-days = [today - datetime.timedelta(days=i) for i in range(26)]
+HEADER = ["timestamp", "open", "high", "low", "close"]
+
+
+def generate_candles(
+    count: int,
+    *,
+    seed: int | None = None,
+    start: int = 7500,
+    volatility: int = 100,
+    wick: int = 50,
+    floor: int = 0,
+    ceiling: int | None = None,
+    end: datetime.datetime | None = None,
+    interval: datetime.timedelta = datetime.timedelta(days=1)
+) -> list[list[int]]:
+    """
+    生成随机游走的K线数据 (按时间升序)，给定seed时结果确定
+
+    :param count: K线数量
+    :param seed: 随机种子 (默认为不确定的随机)
+    :param start: 第一根K线的开盘分
+    :param volatility: 每根K线开收盘的最大变化
+    :param wick: 上下影线的最大长度
+    :param floor: 分数下限 (触及时反弹)
+    :param ceiling: 分数上限 (触及时回落，默认不限)
+    :param end: 最后一根K线的时间 (默认为今天零点)
+    :param interval: K线间隔
+    """
+    rng = random.Random(seed)
+    if end is None:
+        end = datetime.datetime.combine(datetime.date.today(), datetime.time.min)
+    upper = ceiling if ceiling is not None else start + count * (volatility + wick)
+    rows: list[list[int]] = []
+    now = min(max(start, floor), upper)
+    for i in range(count):
+        t = int((end - (count - 1 - i) * interval).timestamp())
+        o = now
+        c = o + rng.randint(-volatility, volatility)
+        # 超出范围时向内反射
+        if c < floor:
+            c = 2 * floor - c
+        if c > upper:
+            c = 2 * upper - c
+        c = min(max(c, floor), upper)
+        h = min(max(o, c) + rng.randint(0, wick), upper)
+        l = max(min(o, c) - rng.randint(0, wick), floor)
+        rows.append([t, o, h, l, c])
+        now = c
+    return rows
 
-header = ["timestamp", "open", "high", "low", "close"]
-datas: list[list[int]] = []
 
-now = 7500
+def write_csv(rows: list[list[int]], path: str) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
 
-for day in days:
-    t = int(day.timestamp())
-    delta = random.randint(-100, 100)
-    o = now
-    c = now + delta
-    h = max(o, c) + random.randint(0, 50)
-    l = min(o, c) - random.randint(0, 50)
-    datas.append([t, o, h, l, c])
-    now = c
 
-# save to csv
-with open("kline-ico.csv", "w", encoding="utf-8", newline="") as f:
-    writer = csv.writer(f)
-    writer.writerow(header)
-    writer.writerows(datas)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('output', nargs='?', default='kline-ico.csv', help='输出的CSV文件')
+    parser.add_argument('-n', '--count', type=int, default=26, help='K线数量')
+    parser.add_argument('--seed', type=int, default=None, help='随机种子')
+    parser.add_argument('--start', type=int, default=7500, help='初始分数')
+    parser.add_argument('--volatility', type=int, default=100, help='每根K线开收盘的最大变化')
+    parser.add_argument('--wick', type=int, default=50, help='上下影线的最大长度')
+    parser.add_argument('--floor', type=int, default=0, help='分数下限')
+    parser.add_argument('--ceiling', type=int, default=None, help='分数上限')
+    args = parser.parse_args()
+    write_csv(generate_candles(
+        args.count,
+        seed=args.seed,
+        start=args.start,
+        volatility=args.volatility,
+        wick=args.wick,
+        floor=args.floor,
+        ceiling=args.ceiling
+    ), args.output)
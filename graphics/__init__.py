@@ -1,3 +1,5 @@
 from .enumeratement import *
 from .base import *
-from .common import CommonGraphics
\ No newline at end of file
+from .common import CommonGraphics
+from .cache import LRUCache
+from .array import ArrayGraphics
\ No newline at end of file
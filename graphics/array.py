@@ -0,0 +1,106 @@
+from .enumeratement import *
+from .common import CommonGraphics
+from PIL import Image
+import threading
+
+try:
+    import numpy as np
+except ImportError: # numpy为可选依赖，缺失时只能使用Pillow绘制
+    np = None
+
+
+class ArrayGraphics:
+    """
+    CommonGraphics的数组版本: 素材为uint8 RGBA数组 (高, 宽, 4)，整列以np.tile平铺、切片翻转、np.repeat缩放
+
+    生成的像素与CommonGraphics.gen_image一致，返回的数组为整列的视图 (共享，不可修改)
+    """
+    _instances: dict[CommonGraphics, 'ArrayGraphics'] = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def of(cls, graphics: CommonGraphics) -> 'ArrayGraphics':
+        """
+        素材对应的数组版本 (每个素材只转换一次)
+        """
+        if graphics not in cls._instances:
+            with cls._instances_lock:
+                if graphics not in cls._instances:
+                    cls._instances[graphics] = cls(graphics)
+        return cls._instances[graphics]
+
+    @staticmethod
+    def to_array(image: Image.Image) -> 'np.ndarray':
+        """
+        转为 (高, 宽, 4) 的uint8数组 (空图像为形状正确的空数组)
+        """
+        if image.mode != "RGBA":
+            image = image.convert("RGBA")
+        return np.asarray(image, dtype=np.uint8).reshape(image.height, image.width, 4)
+
+    @staticmethod
+    def upscale(array: 'np.ndarray', scale: int) -> 'np.ndarray':
+        """
+        最近邻放大整数倍 (与Image.resize(NEAREST)一致)，按uint32整像素复制
+        """
+        if scale == 1:
+            return array
+        pixels = np.ascontiguousarray(array).view(np.uint32)[..., 0]
+        pixels = np.repeat(np.repeat(pixels, scale, axis=1), scale, axis=0)
+        return pixels.view(np.uint8).reshape(*pixels.shape, 4)
+
+    def __init__(self, graphics: CommonGraphics):
+        if np is None:
+            raise ValueError("ArrayGraphics requires numpy")
+        self.graphics = graphics
+        self.static = self.to_array(graphics.static)
+        self.region = self.to_array(graphics.region)
+        self.duplication = self.to_array(graphics.duplication)
+        self._lock = threading.Lock()
+
+    def column(self, length: int, *, scale: int = 1, direction: Direction = Direction.up) -> 'np.ndarray':
+        """
+        预计算的整列数组 (已按方向翻转、按scale缩放)，长度不小于length，按最长的请求倍增
+        """
+        with self._lock:
+            if getattr(self, "_columns", None) is None or self._column_length < length:
+                self._column_length = max(length, 2 * getattr(self, "_column_length", 0))
+                self._columns: dict[tuple[Direction, int], np.ndarray] = {}
+            key = (Direction.down if direction == Direction.down else Direction.up, scale)
+            if key not in self._columns:
+                self._columns[key] = self._render(self._column_length, scale, key[0])
+            return self._columns[key]
+
+    def _render(self, length: int, scale: int, direction: Direction) -> 'np.ndarray':
+        width = self.graphics.width
+        column = np.zeros((self.static.shape[0] + length, width.maximun, 4), dtype=np.uint8)
+        y = self.static.shape[0]
+        if y:
+            x = width.centralize_static()
+            column[:y, x:x + self.static.shape[1]] = self.static
+        if length > 0 and self.region.shape[0]:
+            rows = min(length, self.region.shape[0])
+            x = width.centralize_region()
+            column[y:y + rows, x:x + self.region.shape[1]] = self.region[:rows]
+            y, length = y + self.region.shape[0], length - rows
+        if length > 0 and self.duplication.shape[0]:
+            repeats = -(-length // self.duplication.shape[0])
+            x = width.centralize_duplication()
+            column[y:y + length, x:x + self.duplication.shape[1]] = np.tile(self.duplication, (repeats, 1, 1))[:length]
+        if direction == Direction.down:
+            column = column[::-1]
+        return self.upscale(column, scale)
+
+    def gen_array(self, length: int, *, scale: int | None = None, direction: Direction = Direction.up) -> 'np.ndarray':
+        """
+        指定长度的数组 (与CommonGraphics.gen_image的像素一致)
+        """
+        scale = scale if scale and scale > 1 else 1
+        column = self.column(length, scale=scale, direction=direction)
+        height = (self.static.shape[0] + length) * scale
+        if direction == Direction.down:
+            return column[column.shape[0] - height:]
+        return column[:height]
+
+
+__all__ = ["ArrayGraphics"]
@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, TypeVar
+import threading
+
+
+T = TypeVar("T")
+
+
+class LRUCache:
+    """
+    进程级的有界(LRU)缓存 (线程安全)
+
+    缓存中的对象(通常是Image)为共享对象，调用方不得修改，需要修改时请先copy
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], T]) -> T:
+        """
+        命中则直接返回缓存对象，否则调用factory创建并缓存
+
+        factory在锁外执行，并发未命中时可能重复创建，以先写入的为准
+        """
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return self._data[key]
+            self.misses += 1
+        value = factory()
+        with self._lock:
+            if key in self._data:
+                return self._data[key]
+            self._store(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> dict[str, int]:
+        """
+        命中统计
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
+
+
+__all__ = ["LRUCache"]
@@ -1,12 +1,13 @@
 from .base import *
 from .enumeratement import *
-from typing import Any
+from .cache import LRUCache
+from typing import Any, NamedTuple
 from PIL import Image
-from pydantic import BaseModel
 from typing_extensions import deprecated
+import threading
 
 
-class Structure(BaseModel):
+class Structure(NamedTuple):
     static: int
     region: int
     duplication: int
@@ -67,6 +68,8 @@ def process_coord(image: Image.Image, x: int | str, y: int | str, w: int | str,
 
 class CommonGraphics(PropertiesGraphics):
     __GRAPHICS_PROPERTIES__ = { "static", "region", "duplication" }
+    # 进程级的精灵图缓存: (素材, 长度, 方向, 缩放) -> Image
+    cache = LRUCache(1024)
 
     @staticmethod
     def transfer(image: Image.Image, x: int | str, y: int | str, w: int | str, h: int | str):
@@ -76,6 +79,7 @@ class CommonGraphics(PropertiesGraphics):
 
     def __init__(self, image: Image.Image, properties: dict[str, Any]):
         super().__init__(image, properties)
+        self._lock = threading.RLock()
         assert 'center' not in properties or isinstance(properties["center"], list) and len(properties["center"]) == 2, "Center must be a list with 2 elements"
         self._center: tuple[int, int] = tuple(properties.get("center", (image.width // 2, 0)))
         mode_name = str(properties.get("mode", "")).strip('_')
@@ -121,12 +125,28 @@ class CommonGraphics(PropertiesGraphics):
     def gen_duplication(self, length: int):
         if self.duplication.height <= 0:
             return None, length
-        quotient, remainder = divmod(length, self.duplication.height)
-        new_image = Image.new("RGBA", (self.duplication.width, length))
-        for i in range(quotient):
-            new_image.paste(self.duplication, (0, i * self.duplication.height))
-        new_image.paste(self.duplication.crop((0, 0, self.duplication.width, remainder)), (0, quotient * self.duplication.height))
-        return new_image, 0
+        return self.strip(length).crop((0, 0, self.duplication.width, length)), 0
+
+    def strip(self, length: int) -> Image.Image:
+        """
+        预平铺的duplication条带 (按需倍增，高度不小于length)
+        """
+        with self._lock:
+            return self._grow_strip(length)
+
+    def _grow_strip(self, length: int) -> Image.Image:
+        if getattr(self, "_strip", None) is None or self._strip.height < length:
+            height = max(length, 2 * getattr(self, "_strip", self.duplication).height)
+            strip = Image.new("RGBA", (self.duplication.width, height))
+            strip.paste(self.duplication, (0, 0))
+            filled = self.duplication.height
+            # 每次复制已平铺的部分，O(log length)次粘贴
+            while filled < height:
+                copied = min(filled, height - filled)
+                strip.paste(strip.crop((0, 0, strip.width, copied)), (0, filled))
+                filled += copied
+            self._strip = strip
+        return self._strip
 
     @property
     def width(self) -> Structure:
@@ -155,6 +175,42 @@ class CommonGraphics(PropertiesGraphics):
         return (width - self.width.maximun) // 2
 
     def gen_image(self, length: int, *, scale: int | None = None, direction: Direction = Direction.up) -> Image.Image:
+        """
+        生成指定长度的图像 (经过缓存，返回的图像为共享对象，不可修改)
+        """
+        return self.cache.get_or_create(
+            (self, length, direction, scale or 1),
+            lambda: self._gen_image(length, scale=scale, direction=direction)
+        )
+
+    def _gen_image(self, length: int, *, scale: int | None = None, direction: Direction = Direction.up) -> Image.Image:
+        scale = scale if scale and scale > 1 else 1
+        column = self.column(length, scale=scale, direction=direction)
+        height = (self.height.static + length) * scale
+        # 任意长度都是整列的前缀 (向下时为翻转后的后缀)，一次裁剪即可
+        if direction == Direction.down:
+            return column.crop((0, column.height - height, column.width, column.height))
+        return column.crop((0, 0, column.width, height))
+
+    def column(self, length: int, *, scale: int = 1, direction: Direction = Direction.up) -> Image.Image:
+        """
+        预计算的整列图像 (已按方向翻转、按scale缩放)，长度不小于length
+
+        整列按最长的请求倍增，增长时丢弃旧的整列
+        """
+        with self._lock:
+            return self._grow_column(length, scale, direction)
+
+    def _grow_column(self, length: int, scale: int, direction: Direction) -> Image.Image:
+        if getattr(self, "_columns", None) is None or self._column_length < length:
+            self._column_length = max(length, 2 * getattr(self, "_column_length", 0))
+            self._columns: dict[tuple[Direction, int], Image.Image] = {}
+        key = (Direction.down if direction == Direction.down else Direction.up, scale)
+        if key not in self._columns:
+            self._columns[key] = self._render(self._column_length, scale=scale, direction=key[0])
+        return self._columns[key]
+
+    def _render(self, length: int, *, scale: int | None = None, direction: Direction = Direction.up) -> Image.Image:
         new_image = Image.new("RGBA", (self.width.maximun, self.height.static + length))
         new_image.paste(self.static, (self.width.centralize_static(), 0))
         if length > 0:
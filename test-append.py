@@ -0,0 +1,30 @@
+from asset import *
+from genkline import generate_candles
+from PIL import ImageChops
+
+asset_init()
+
+# 渲染后追加K线 (分数范围不变)，各后端的图像层应与一次性渲染的结果一致
+rows = generate_candles(21, seed=3, volatility=20, wick=20)
+candles = [Candle(timestamp=t, open=o, high=h, low=l, close=c) for t, o, h, l, c in rows]
+# 最后一根K线落在前20根的分数范围之内
+low, high = min(candle.low for candle in candles[:20]), max(candle.high for candle in candles[:20])
+last = candles[-1]
+candles[-1] = Candle(timestamp=last.timestamp, open=low + 1, high=low + 3, low=low, close=low + 2)
+assert high > low + 3
+
+# 只读取image时NumPy后端不生成子图像；读取merged_image时会生成子图像
+cases = [(logical, rendered) for logical in (True, False) for rendered in (('image',), ('logical_image', 'image', 'merged_image'))]
+
+for backend in CandleGraphicsResources.BACKENDS:
+    CandleGraphicsResources.backend = backend
+    for logical, rendered in cases:
+        group = CandleGroup(candles=candles[:20], logical=logical)
+        for name in rendered:
+            getattr(group, name)
+        group.append(candles[-1])
+        expected = CandleGroup(candles=candles, logical=logical)
+        for name in ('logical_image', 'image', 'merged_image'):
+            got, want = getattr(group, name), getattr(expected, name)
+            assert got.size == want.size and ImageChops.difference(got, want).getbbox() is None, (backend, logical, rendered, name)
+        print(f'{backend:>7} logical={logical} {"+".join(rendered)}: ok')
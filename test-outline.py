@@ -0,0 +1,36 @@
+from asset import *
+from PIL import Image, ImageChops, ImageStat
+import time
+
+asset_init()
+
+# 对比各描边引擎与legacy的输出 (尺寸、逐通道平均/最大差异、耗时)
+texts = ['8888', '(7729)', '2024/06/09', '12:34:56']
+engines = ['legacy', 'stroke', 'dilate']
+
+rows: list[list[Image.Image]] = []
+for text in texts:
+    row: list[Image.Image] = []
+    reference = NumberGraphicsResources.draw_text_with_outline(text, outline_color='red', outline_width=NumberGraphicsResources.border, engine='legacy')
+    for engine in engines:
+        start = time.perf_counter()
+        for _ in range(20):
+            image = NumberGraphicsResources.draw_text_with_outline(text, outline_color='red', outline_width=NumberGraphicsResources.border, engine=engine)
+        cost = (time.perf_counter() - start) / 20 * 1000
+        if image.size == reference.size:
+            stat = ImageStat.Stat(ImageChops.difference(image, reference))
+            diff = f'mean={max(stat.mean):.2f} max={max(extrema[1] for extrema in stat.extrema)}'
+        else:
+            diff = f'size {image.size} != {reference.size}'
+        print(f'{text:>12} {engine:>7}: {cost:.2f}ms {diff}')
+        row.append(image)
+    rows.append(row)
+
+# 保存对比图 (每行一个文本，每列一个引擎)
+cell_width = max(image.width for row in rows for image in row)
+cell_height = max(image.height for row in rows for image in row)
+compare = Image.new('RGBA', (cell_width * len(engines), cell_height * len(texts)), 'white')
+for y, row in enumerate(rows):
+    for x, image in enumerate(row):
+        compare.alpha_composite(image, (x * cell_width, y * cell_height))
+compare.save('test-outline.png')